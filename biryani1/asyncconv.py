@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+
+
+# Biryani -- A conversion and validation toolbox
+# By: Emmanuel Raviart <eraviart@easter-eggs.com>
+#
+# Copyright (C) 2009, 2010, 2011, 2012 Easter-eggs
+# http://packages.python.org/Biryani1/
+#
+# This file is part of Biryani.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Asynchronous Converters
+
+An asynchronous converter is a converter that returns a ``concurrent.futures.Future`` whose result is the usual
+``(value, error)`` couple, instead of the couple itself. The compound converters of this module accept both
+synchronous and asynchronous converters, never block while waiting for the results of asynchronous converters and
+always return a future.
+
+.. note:: Asynchronous converters are not in :mod:`biryani1.baseconv`, because they use the non-standard
+   ``concurrent.futures`` library (``futures`` package).
+"""
+
+
+import collections
+import itertools
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+from .baseconv import fail, N_
+from . import states
+
+
+__all__ = [
+    'async_pipe',
+    'async_struct',
+    'async_structured_mapping',
+    'async_structured_sequence',
+    'async_uniform_sequence',
+    'completed_future',
+    'gather_results',
+    'get_default_executor',
+    'get_io_bound_executor',
+    'io_bound',
+    'make_async_converter',
+    'threaded_struct',
+    ]
+
+
+default_executor = None
+executors_lock = threading.Lock()
+io_bound_executor = None
+
+
+def async_pipe(*converters):
+    """Return an asynchronous compound converter that applies each of its (synchronous or asynchronous) converters till
+    the end or an error occurs.
+
+    >>> from biryani1.baseconv import input_to_int, test_greater_or_equal
+    >>> converter = async_pipe(input_to_int, make_async_converter(test_greater_or_equal(0)))
+    >>> converter(u'42').result()
+    (42, None)
+    >>> converter(u'-1').result()
+    (-1, u'Value must be greater than or equal to 0')
+    >>> converter(u'Hello world!').result()
+    (u'Hello world!', u'Value must be an integer')
+    >>> async_pipe()(42).result()
+    (42, None)
+    """
+    converters = [
+        converter
+        for converter in converters
+        if converter is not None
+        ]
+
+    def async_pipe_converter(value, state = None):
+        future = Future()
+        remaining_converters = iter(converters)
+
+        def convert(value):
+            for converter in remaining_converters:
+                try:
+                    result = converter(value, state = state)
+                except Exception, e:
+                    future.set_exception(e)
+                    return
+                if isinstance(result, Future):
+                    result.add_done_callback(convert_next)
+                    return
+                value, error = result
+                if error is not None:
+                    future.set_result((value, error))
+                    return
+            future.set_result((value, None))
+
+        def convert_next(converter_future):
+            try:
+                value, error = converter_future.result()
+            except Exception, e:
+                future.set_exception(e)
+                return
+            if error is not None:
+                future.set_result((value, error))
+                return
+            convert(value)
+
+        convert(value)
+        return future
+    return async_pipe_converter
+
+
+def async_struct(converters, constructor = None, default = None, drop_none_values = False, keep_value_order = False,
+        skip_missing_items = False):
+    """Return an asynchronous converter that maps a collection of (synchronous or asynchronous) converters to a
+    collection (ie dict, list, set, etc) of values.
+
+    The converters of the items are all called before waiting for any of their results, so that asynchronous
+    converters run concurrently. See :func:`biryani1.baseconv.struct` for the meaning of the parameters.
+
+    >>> from biryani1.baseconv import cleanup_line, input_to_email, input_to_int, not_none, pipe
+    >>> converter = async_struct(dict(
+    ...     name = pipe(cleanup_line, not_none),
+    ...     age = make_async_converter(input_to_int),
+    ...     email = make_async_converter(input_to_email),
+    ...     ))
+    >>> converter(dict(name = u'John Doe', age = u'72', email = u'john@doe.name')).result()
+    ({'age': 72, 'email': u'john@doe.name', 'name': u'John Doe'}, None)
+    >>> converter(dict(name = u'John Doe', age = u'72', phone = u'+33 9 12 34 56 78')).result()
+    ({'phone': u'+33 9 12 34 56 78', 'age': 72, 'email': None, 'name': u'John Doe'}, {'phone': u'Unexpected item'})
+    >>> async_struct(
+    ...     [
+    ...         pipe(cleanup_line, not_none),
+    ...         make_async_converter(input_to_int),
+    ...         ],
+    ...     constructor = tuple,
+    ...     )([u'John Doe', u'Hello world!']).result()
+    ((u'John Doe', u'Hello world!'), {1: u'Value must be an integer'})
+    >>> converter(None).result()
+    (None, None)
+    """
+    if isinstance(converters, collections.Mapping):
+        return async_structured_mapping(converters, constructor = constructor, default = default,
+            drop_none_values = drop_none_values, keep_value_order = keep_value_order,
+            skip_missing_items = skip_missing_items)
+    assert isinstance(converters, collections.Sequence), \
+        'Converters must be a mapping or a sequence. Got {0} instead.'.format(type(converters))
+    return async_structured_sequence(converters, constructor = constructor, default = default)
+
+
+def async_structured_mapping(converters, constructor = None, default = None, drop_none_values = False,
+        keep_value_order = False, skip_missing_items = False):
+    """Return an asynchronous converter that maps a mapping of converters to a mapping (ie dict, etc) of values.
+
+    .. note:: This converter should not be used directly. Use :func:`async_struct` instead.
+    """
+    if constructor is None:
+        constructor = type(converters)
+    converters = constructor(
+        (name, converter)
+        for name, converter in (converters or {}).iteritems()
+        if converter is not None
+        )
+
+    def async_structured_mapping_converter(values, state = None):
+        if values is None:
+            return completed_future((values, None))
+        if state is None:
+            state = states.default_state
+        if keep_value_order:
+            values_converter = constructor()
+            for name in values:
+                if name in converters:
+                    values_converter[name] = converters[name]
+                elif default != 'drop':
+                    values_converter[name] = default \
+                        if default is not None \
+                        else fail(error = N_(u'Unexpected item'))
+            for name, value_converter in converters.iteritems():
+                if name not in values_converter:
+                    values_converter[name] = value_converter
+        elif default == 'drop':
+            values_converter = converters
+        else:
+            values_converter = converters.copy()
+            for name in values:
+                if name not in values_converter:
+                    values_converter[name] = default if default is not None else fail(error = N_(u'Unexpected item'))
+        names = [
+            name
+            for name in values_converter
+            if not skip_missing_items or name in values
+            ]
+
+        def build_mapping(results):
+            errors = constructor()
+            converted_values = constructor()
+            for name, (value, error) in itertools.izip(names, results):
+                if value is not None or not drop_none_values or drop_none_values == 'missing' and name in values:
+                    converted_values[name] = value
+                if error is not None:
+                    errors[name] = error
+            return converted_values, errors or None
+
+        return gather_results([
+            values_converter[name](values.get(name), state = state)
+            for name in names
+            ], build_mapping)
+    return async_structured_mapping_converter
+
+
+def async_structured_sequence(converters, constructor = None, default = None):
+    """Return an asynchronous converter that maps a sequence of converters to a sequence of values.
+
+    .. note:: This converter should not be used directly. Use :func:`async_struct` instead.
+    """
+    if constructor is None:
+        constructor = type(converters)
+    converters = [
+        converter
+        for converter in converters or []
+        if converter is not None
+        ]
+
+    def async_structured_sequence_converter(values, state = None):
+        if values is None:
+            return completed_future((values, None))
+        if state is None:
+            state = states.default_state
+        if default == 'drop':
+            values_converter = converters
+        else:
+            values_converter = converters[:]
+            while len(values) > len(values_converter):
+                values_converter.append(default if default is not None else fail(error = N_(u'Unexpected item')))
+
+        def build_sequence(results):
+            errors = {}
+            converted_values = []
+            for i, (value, error) in enumerate(results):
+                converted_values.append(value)
+                if error is not None:
+                    errors[i] = error
+            return constructor(converted_values), errors or None
+
+        return gather_results([
+            converter(value, state = state)
+            for converter, value in itertools.izip_longest(
+                values_converter, itertools.islice(values, len(values_converter)))
+            ], build_sequence)
+    return async_structured_sequence_converter
+
+
+def async_uniform_sequence(converter, constructor = list, drop_none_items = False):
+    """Return an asynchronous converter that applies the same (synchronous or asynchronous) converter to each value of
+    a list, converting all the values concurrently.
+
+    >>> from biryani1.baseconv import input_to_int
+    >>> converter = async_uniform_sequence(make_async_converter(input_to_int))
+    >>> converter([u'42', u'43', u'Hello world!']).result()
+    ([42, 43, u'Hello world!'], {2: u'Value must be an integer'})
+    >>> async_uniform_sequence(input_to_int, drop_none_items = True)([u'42', None, u'43']).result()
+    ([42, 43], None)
+    >>> converter(None).result()
+    (None, None)
+    """
+    def async_uniform_sequence_converter(values, state = None):
+        if values is None:
+            return completed_future((values, None))
+        if state is None:
+            state = states.default_state
+        custom_constructor = type(values) if constructor is None else constructor
+
+        def build_sequence(results):
+            errors = {}
+            converted_values = []
+            for i, (value, error) in enumerate(results):
+                if not drop_none_items or value is not None:
+                    converted_values.append(value)
+                if error is not None:
+                    errors[i] = error
+            return custom_constructor(converted_values), errors or None
+
+        return gather_results([
+            converter(value, state = state)
+            for value in values
+            ], build_sequence)
+    return async_uniform_sequence_converter
+
+
+def completed_future(result):
+    """Return a future that is already done with given *result*."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def gather_results(results, function = None):
+    """Return a future of the list of the ``(value, error)`` results of synchronous or asynchronous converters.
+
+    *results* is a list whose items are either ``(value, error)`` couples or futures of such couples. When a
+    *function* is given, the result of the returned future is the value returned by this function, called with the
+    list of results.
+
+    >>> gather_results([(1, None), completed_future((2, u'Error'))]).result()
+    [(1, None), (2, u'Error')]
+    >>> gather_results([], len).result()
+    0
+    """
+    future = Future()
+    results = list(results)
+    pending_indexes = [
+        index
+        for index, result in enumerate(results)
+        if isinstance(result, Future)
+        ]
+    pending_count = [len(pending_indexes)]
+    lock = threading.Lock()
+
+    def complete():
+        try:
+            future.set_result(function(results) if function is not None else results)
+        except Exception, e:
+            future.set_exception(e)
+
+    def make_callback(index):
+        def callback(result_future):
+            try:
+                result = result_future.result()
+            except Exception, e:
+                with lock:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            with lock:
+                if future.done():
+                    return
+                results[index] = result
+                pending_count[0] -= 1
+                if pending_count[0] == 0:
+                    complete()
+        return callback
+
+    if not pending_indexes:
+        complete()
+    for index in pending_indexes:
+        results[index].add_done_callback(make_callback(index))
+    return future
+
+
+def get_default_executor(max_workers = 16):
+    """Return the thread pool executor used by asynchronous converters when none is given, creating it at first
+    call."""
+    global default_executor
+    if default_executor is None:
+        with executors_lock:
+            if default_executor is None:
+                default_executor = ThreadPoolExecutor(max_workers = max_workers)
+    return default_executor
+
+
+def get_io_bound_executor(max_workers = 16):
+    """Return the thread pool executor used by :func:`threaded_struct` when none is given, creating it at first call.
+
+    It is distinct from the executor returned by :func:`get_default_executor`, so that I/O-bound converters that hang
+    don't starve asynchronous converters (and vice versa).
+
+    >>> get_io_bound_executor() is get_io_bound_executor()
+    True
+    >>> get_io_bound_executor() is get_default_executor()
+    False
+    """
+    global io_bound_executor
+    if io_bound_executor is None:
+        with executors_lock:
+            if io_bound_executor is None:
+                io_bound_executor = ThreadPoolExecutor(max_workers = max_workers)
+    return io_bound_executor
+
+
+def io_bound(converter, timeout = None):
+    """Return a converter that marks a (synchronous and blocking) converter as I/O-bound, so that
+    :func:`threaded_struct` runs it in a thread pool, concurrently with the other I/O-bound converters.
+
+    *timeout* is the maximum number of seconds given to the converter, counted from the start of the conversion of the
+    whole structure.
+
+    When it is not used by :func:`threaded_struct`, the returned converter simply calls *converter*.
+
+    >>> from biryani1.baseconv import input_to_int
+    >>> io_bound(input_to_int, timeout = 10)(u'42')
+    (42, None)
+    """
+    def io_bound_converter(value, state = None):
+        return converter(value, state = state)
+    io_bound_converter.io_bound_converter = converter
+    io_bound_converter.io_bound_timeout = timeout
+    return io_bound_converter
+
+
+def make_async_converter(converter, executor = None):
+    """Return an asynchronous converter that runs a synchronous (and usually blocking) converter in an executor.
+
+    *executor* is a ``concurrent.futures`` executor. It defaults to a module-wide thread pool executor.
+
+    >>> from biryani1.baseconv import input_to_int
+    >>> make_async_converter(input_to_int)(u'42').result()
+    (42, None)
+    """
+    def async_converter(value, state = None):
+        return (executor or get_default_executor()).submit(converter, value, state = state)
+    return async_converter
+
+
+def threaded_struct(converters, constructor = None, default = None, drop_none_values = False, executor = None,
+        keep_value_order = False, skip_missing_items = False):
+    """Return a (synchronous) converter that maps a collection of converters to a collection of values, running the
+    converters marked with :func:`io_bound` concurrently in *executor* (a ``concurrent.futures`` executor, the
+    executor returned by :func:`get_io_bound_executor` by default).
+
+    The conversion takes as long as its slowest I/O-bound converter, instead of the sum of their durations. An
+    I/O-bound converter whose timeout expires gives an error (its late result is ignored). Results are always
+    collected in the same order, whatever the order in which the converters end. See :func:`biryani1.baseconv.struct`
+    for the meaning of the other parameters.
+
+    .. warning:: A timed out converter is not interrupted: It keeps its worker thread till it ends. I/O-bound
+       converters should limit the duration of their own operations (for example with socket timeouts), otherwise
+       hung converters end up using every worker of the executor.
+
+    Each of the two I/O-bound converters below waits till the other one has started, so the conversion succeeds only
+    when they run concurrently:
+
+    >>> import threading, time
+    >>> from biryani1.baseconv import cleanup_line, function, input_to_int
+    >>> def make_rendezvous_converter(own_event, other_event):
+    ...     return function(lambda value: own_event.set() or other_event.wait(10) and value)
+    >>> email_started, url_started = threading.Event(), threading.Event()
+    >>> converter = threaded_struct(dict(
+    ...     name = cleanup_line,
+    ...     age = io_bound(input_to_int),
+    ...     email = io_bound(make_rendezvous_converter(email_started, url_started)),
+    ...     url = io_bound(make_rendezvous_converter(url_started, email_started), timeout = 10),
+    ...     ))
+    >>> converter(dict(name = u' John Doe ', age = u'72', email = u'john@doe.name', url = u'http://doe.name/'))
+    ({'url': u'http://doe.name/', 'age': 72, 'email': u'john@doe.name', 'name': u'John Doe'}, None)
+    >>> def make_slow_converter(seconds):
+    ...     return function(lambda value: time.sleep(seconds) or value)
+    >>> threaded_struct([cleanup_line, io_bound(make_slow_converter(1), timeout = 0.05)])([u'John Doe', u'Late'])
+    ([u'John Doe', u'Late'], {1: u'Conversion timed out'})
+    >>> converter(None)
+    (None, None)
+    """
+    if isinstance(converters, collections.Mapping):
+        is_mapping = True
+    else:
+        assert isinstance(converters, collections.Sequence), \
+            'Converters must be a mapping or a sequence. Got {0} instead.'.format(type(converters))
+        is_mapping = False
+
+    def threaded_struct_converter(values, state = None):
+        if values is None:
+            return values, None
+        if state is None:
+            state = states.default_state
+        started = time.time()
+        pending_items = []
+
+        def make_submitter(converter):
+            def submit(value, state = None):
+                item_future = Future()
+                worker_future = (executor or get_io_bound_executor()).submit(converter.io_bound_converter, value,
+                    state = state)
+                pending_items.append((item_future, worker_future, converter.io_bound_timeout, value))
+                return item_future
+            return submit
+
+        if is_mapping:
+            async_converters = type(converters)(
+                (name, make_submitter(converter) if hasattr(converter, 'io_bound_converter') else converter)
+                for name, converter in converters.iteritems()
+                )
+        else:
+            async_converters = type(converters)(
+                make_submitter(converter) if hasattr(converter, 'io_bound_converter') else converter
+                for converter in converters
+                )
+        future = async_struct(async_converters, constructor = constructor, default = default,
+            drop_none_values = drop_none_values, keep_value_order = keep_value_order,
+            skip_missing_items = skip_missing_items)(values, state = state)
+        for item_future, worker_future, timeout, value in pending_items:
+            try:
+                result = worker_future.result(
+                    timeout = max(started + timeout - time.time(), 0) if timeout is not None else None)
+            except TimeoutError:
+                worker_future.cancel()
+                result = value, state._(u'Conversion timed out')
+            except Exception, e:
+                item_future.set_exception(e)
+                continue
+            item_future.set_result(result)
+        return future.result()
+    return threaded_struct_converter
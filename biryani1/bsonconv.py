@@ -41,13 +41,16 @@ __all__ = [
     'bson_to_json',
     'input_to_object_id',
     'json_to_bson',
+    'make_input_to_object_ids',
     'object_id_re',
+    'object_ids_re',
     'object_id_to_str',
     'str_to_object_id',
     ]
 
 
 object_id_re = re.compile(r'[\da-f]{24}$')
+object_ids_re = re.compile(r'(?:[\da-fA-F]{24},)*$')
 
 
 # Utility functions
@@ -57,48 +60,90 @@ def convert_bson_to_json(value):
     """Recursively convert a BSON value to JSON.
 
     A MongoDB document can't have an item with a key containing a ".". So they are escaped with "%".
+
+    .. note:: Dicts & lists that don't contain any escaped key are returned unchanged (they are not copied).
+
+    >>> document = {'a': {'b': [{'c': 1}]}, 'd%2ee': {'f': 2}}
+    >>> json_document = convert_bson_to_json(document)
+    >>> json_document
+    {'a': {'b': [{'c': 1}]}, 'd.e': {'f': 2}}
+    >>> json_document['a'] is document['a'], json_document['d.e'] is document['d%2ee']
+    (True, True)
     """
-    if value is None:
-        return value
-    if isinstance(value, dict):
-        # Note: Use type(value) instead of dict, to support OrderedDict.
-        return type(value)(
-            (
-                item_key.replace('%2e', '.').replace('%25', '%'),
-                convert_bson_to_json(item_value),
-                )
-            for item_key, item_value in value.iteritems()
-            )
-    if isinstance(value, list):
-        return [
-            convert_bson_to_json(item)
-            for item in value
-            ]
-    return value
+    return convert_keys(value, unescape_bson_key, lambda key: '%' in key)
 
 
 def convert_json_to_bson(value):
     """Recursively convert a JSON value to BSON.
 
     A MongoDB document can't have an item with a key containing a ".". So they are escaped with "%".
+
+    .. note:: Dicts & lists that don't contain any key to escape are returned unchanged (they are not copied).
+
+    >>> document = {'a': [{'b.c': 1}, {'d': 2}], 'e': {'f': 3}}
+    >>> bson_document = convert_json_to_bson(document)
+    >>> bson_document
+    {'a': [{'b%2ec': 1}, {'d': 2}], 'e': {'f': 3}}
+    >>> bson_document['a'][1] is document['a'][1], bson_document['e'] is document['e']
+    (True, True)
+    >>> convert_json_to_bson(document['e']) is document['e']
+    True
+    >>> bson_document = convert_json_to_bson({u'\xe9.': 1, 'a\xc3\xa9': 2})
+    >>> bson_document[u'\xe9%2e'], bson_document['a\xc3\xa9']
+    (1, 2)
     """
-    if value is None:
+    return convert_keys(value, escape_bson_key, lambda key: '.' in key or '%' in key)
+
+
+def convert_keys(value, convert_key, key_needs_conversion):
+    """Convert the keys of the dicts nested in a value (made of dicts, lists and scalars), without recursion.
+
+    Only the keys for which *key_needs_conversion* returns a true value are converted (using *convert_key*). Dicts and
+    lists are copied only when they contain a converted key, directly or in a nested dict.
+    """
+    if not isinstance(value, (dict, list)):
         return value
-    if isinstance(value, dict):
-        # Note: Use type(value) instead of dict, to support OrderedDict.
-        return type(value)(
-            (
-                item_key.replace('%', '%25').replace('.', '%2e'),
-                convert_json_to_bson(item_value),
-                )
-            for item_key, item_value in value.iteritems()
-            )
-    if isinstance(value, list):
-        return [
-            convert_json_to_bson(item)
-            for item in value
-            ]
-    return value
+    # Each frame is a (container, iterator over its (key, item) couples, converted items by key, key in parent)
+    # tuple.
+    frames = [(value, value.iteritems() if isinstance(value, dict) else enumerate(value), {}, None)]
+    while True:
+        container, items, converted_item_by_key, key_in_parent = frames[-1]
+        for key, item in items:
+            if item and isinstance(item, (dict, list)):
+                frames.append((item, item.iteritems() if isinstance(item, dict) else enumerate(item), {}, key))
+                break
+        else:
+            frames.pop()
+            converted = container
+            if isinstance(container, dict):
+                if converted_item_by_key or any(key_needs_conversion(key) for key in container):
+                    # Note: Use type(container) instead of dict, to support OrderedDict.
+                    converted = type(container)(
+                        (
+                            convert_key(key) if key_needs_conversion(key) else key,
+                            converted_item_by_key.get(key, item),
+                            )
+                        for key, item in container.iteritems()
+                        )
+            elif converted_item_by_key:
+                converted = [
+                    converted_item_by_key.get(index, item)
+                    for index, item in enumerate(container)
+                    ]
+            if not frames:
+                return converted
+            if converted is not container:
+                frames[-1][2][key_in_parent] = converted
+
+
+def escape_bson_key(key):
+    """Escape the "%" & "." characters of a key, because a MongoDB document can't have a key containing a "."."""
+    return key.replace('%', '%25').replace('.', '%2e')
+
+
+def unescape_bson_key(key):
+    """Unescape a key escaped by :func:`escape_bson_key`."""
+    return key.replace('%2e', '.').replace('%25', '%')
 
 
 # Level-1 Converters
@@ -248,3 +293,85 @@ anything_to_object_id = first_match(
     >>> anything_to_object_id(None)
     (None, None)
     """
+
+
+def make_input_to_object_ids(drop_duplicates = False, drop_none_items = False):
+    """Return a converter that converts a sequence of strings to a list of BSON ObjectIds.
+
+    The returned converter gives the same results as ``uniform_sequence(input_to_object_id)``, but it is much faster
+    for long lists: When every item is a clean ObjectId string (unicode or ``str``), the whole list is validated with
+    a single regular expression match, and each distinct ObjectId is constructed only once. Otherwise, each distinct
+    item is converted once by :func:`input_to_object_id`.
+
+    When *drop_duplicates* is true, only the first occurrence of each ObjectId is kept (for example to build an ``$in``
+    query).
+
+    >>> input_to_object_ids = make_input_to_object_ids()
+    >>> input_to_object_ids([u'4e333f53ff42e928000007d8', '4E333F53FF42E928000007D9', u'4e333f53ff42e928000007d8'])
+    ([ObjectId('4e333f53ff42e928000007d8'), ObjectId('4e333f53ff42e928000007d9'), \
+ObjectId('4e333f53ff42e928000007d8')], None)
+    >>> make_input_to_object_ids(drop_duplicates = True)([u'4e333f53ff42e928000007d8', u'4e333f53ff42e928000007d8'])
+    ([ObjectId('4e333f53ff42e928000007d8')], None)
+    >>> input_to_object_ids([u' 4e333f53ff42e928000007d8 ', u'', None, u'Hello world!'])
+    ([ObjectId('4e333f53ff42e928000007d8'), None, None, u'Hello world!'], {3: u'Invalid value'})
+    >>> make_input_to_object_ids(drop_none_items = True)([u' 4e333f53ff42e928000007d8 ', u'', None])
+    ([ObjectId('4e333f53ff42e928000007d8')], None)
+    >>> input_to_object_ids([u'4e333f53ff42e928000007d8,4e333f53ff42e928000007d9'])
+    ([u'4e333f53ff42e928000007d8,4e333f53ff42e928000007d9'], {0: u'Invalid value'})
+    >>> input_to_object_ids(value.strip() for value in [u'4e333f53ff42e928000007d8 '])
+    ([ObjectId('4e333f53ff42e928000007d8')], None)
+    >>> input_to_object_ids([])
+    ([], None)
+    >>> input_to_object_ids(None)
+    (None, None)
+    """
+    def input_to_object_ids_converter(values, state = None):
+        if values is None:
+            return values, None
+        if state is None:
+            state = states.default_state
+        values = list(values)
+        try:
+            # Note: When all values are of type str, they are validated without being converted to unicode.
+            joined_values = ','.join(values)
+        except (TypeError, UnicodeDecodeError):
+            joined_values = None
+        # The length check ensures that no item contains a comma, ie that each item is a single ObjectId.
+        if joined_values is not None and len(joined_values) == 25 * len(values) - 1 and \
+                object_ids_re.match(joined_values + ',') is not None:
+            object_id_by_id = {}
+            object_ids = []
+            for value in values:
+                id = value.lower()
+                object_id = object_id_by_id.get(id)
+                if object_id is None:
+                    object_id = object_id_by_id[id] = bson.objectid.ObjectId(id)
+                elif drop_duplicates:
+                    continue
+                object_ids.append(object_id)
+            return object_ids, None
+
+        errors = {}
+        object_ids = []
+        result_by_value = {}
+        kept_object_ids = set()
+        for index, value in enumerate(values):
+            if value is None:
+                result = None, None
+            else:
+                result = result_by_value.get(value)
+                if result is None:
+                    result = result_by_value[value] = input_to_object_id(value, state = state)
+            object_id, error = result
+            if error is not None:
+                errors[index] = error
+            elif object_id is None:
+                if drop_none_items:
+                    continue
+            elif drop_duplicates:
+                if object_id in kept_object_ids:
+                    continue
+                kept_object_ids.add(object_id)
+            object_ids.append(object_id)
+        return object_ids, errors or None
+    return input_to_object_ids_converter
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+
+# Biryani -- A conversion and validation toolbox
+# By: Emmanuel Raviart <eraviart@easter-eggs.com>
+#
+# Copyright (C) 2009, 2010, 2011, 2012 Easter-eggs
+# http://packages.python.org/Biryani1/
+#
+# This file is part of Biryani.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Bounded caches used by converters to avoid repeating costly operations"""
+
+
+import collections
+import json
+import sqlite3
+import threading
+import time
+
+
+__all__ = [
+    'LRUCache',
+    'SqliteCache',
+    ]
+
+
+class LRUCache(object):
+    """Thread-safe mapping that keeps at most *max_size* items, discarding the least recently used ones.
+
+    Items may also be given an expiration time (as returned by *clock*, which defaults to ``time.time``), after which
+    they are no more returned.
+
+    >>> cache = LRUCache(max_size = 2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a')
+    1
+    >>> cache['c'] = 3
+    >>> print cache.get('b')
+    None
+    >>> sorted(cache.keys())
+    ['a', 'c']
+    >>> len(cache)
+    2
+    >>> cache.clear()
+    >>> len(cache)
+    0
+
+    Usage with expiration times:
+
+    >>> now = [1000]
+    >>> cache = LRUCache(clock = lambda: now[0])
+    >>> cache.set('a', 1, expiration = 1010)
+    >>> cache.set('b', 2)
+    >>> cache.get('a'), cache.get('b')
+    (1, 2)
+    >>> now[0] = 1010
+    >>> cache.get('a'), cache.get('b')
+    (None, 2)
+    >>> cache.set('c', 3, expiration = 1020)
+    >>> now[0] = 1030
+    >>> cache.remove_expired()
+    >>> cache.keys()
+    ['b']
+    """
+    def __init__(self, max_size = 1000, clock = None):
+        assert max_size > 0, max_size
+        self.clock = clock or time.time
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.items = collections.OrderedDict()
+
+    def __contains__(self, key):
+        return self.get(key, UnboundLocalError) is not UnboundLocalError
+
+    def __delitem__(self, key):
+        with self.lock:
+            del self.items[key]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def get(self, key, default = None):
+        with self.lock:
+            items = self.items
+            item = items.pop(key, None)
+            if item is None:
+                return default
+            expiration = item[1]
+            if expiration is not None and expiration <= self.clock():
+                return default
+            # Move item to the end of the most recently used items.
+            items[key] = item
+            return item[0]
+
+    def keys(self):
+        return self.items.keys()
+
+    def pop(self, key, default = None):
+        with self.lock:
+            item = self.items.pop(key, None)
+        if item is None:
+            return default
+        return item[0]
+
+    def remove_expired(self):
+        """Remove every expired item."""
+        with self.lock:
+            now = self.clock()
+            items = self.items
+            for key, (value, expiration) in items.items():
+                if expiration is not None and expiration <= now:
+                    del items[key]
+
+    def set(self, key, value, expiration = None):
+        """Add or replace an item, optionally giving it an *expiration* time."""
+        with self.lock:
+            items = self.items
+            items.pop(key, None)
+            items[key] = (value, expiration)
+            if len(items) > self.max_size:
+                items.popitem(last = False)
+
+
+class SqliteCache(object):
+    """Thread-safe mapping stored in a SQLite database file, so that its items are kept from one process to the next,
+    with the same interface as :class:`LRUCache` (except that its size is not bounded).
+
+    Keys must be strings and values must be JSON serializable (tuples are returned as lists).
+
+    >>> import os, tempfile
+    >>> file_descriptor, file_path = tempfile.mkstemp(suffix = '.sqlite')
+    >>> os.close(file_descriptor)
+    >>> now = [1000]
+    >>> cache = SqliteCache(file_path, clock = lambda: now[0])
+    >>> cache.set(u'a', (True, None), expiration = 1010)
+    >>> cache[u'b'] = 2
+    >>> cache.close()
+    >>> cache = SqliteCache(file_path, clock = lambda: now[0])
+    >>> cache.get(u'a'), cache.get(u'b'), cache.get(u'c')
+    ([True, None], 2, None)
+    >>> now[0] = 1010
+    >>> cache.get(u'a'), u'a' in cache, u'b' in cache
+    (None, False, True)
+    >>> len(cache)
+    2
+    >>> cache.remove_expired()
+    >>> cache.keys()
+    [u'b']
+    >>> cache.pop(u'b')
+    2
+    >>> len(cache)
+    0
+    >>> cache.close()
+    >>> os.remove(file_path)
+    """
+    def __init__(self, file_path, clock = None):
+        self.clock = clock or time.time
+        self.connection = sqlite3.connect(file_path, check_same_thread = False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS items (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expiration REAL
+                )
+                ''')
+
+    def __contains__(self, key):
+        return self.get(key, UnboundLocalError) is not UnboundLocalError
+
+    def __delitem__(self, key):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM items WHERE key = ?', (key,))
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM items')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get(self, key, default = None):
+        with self.lock:
+            row = self.connection.execute('SELECT value, expiration FROM items WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        value, expiration = row
+        if expiration is not None and expiration <= self.clock():
+            return default
+        return json.loads(value)
+
+    def keys(self):
+        with self.lock:
+            return [
+                key
+                for key, in self.connection.execute('SELECT key FROM items')
+                ]
+
+    def pop(self, key, default = None):
+        with self.lock, self.connection:
+            row = self.connection.execute('SELECT value FROM items WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return default
+            self.connection.execute('DELETE FROM items WHERE key = ?', (key,))
+        return json.loads(row[0])
+
+    def remove_expired(self):
+        """Remove every expired item."""
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM items WHERE expiration <= ?', (self.clock(),))
+
+    def set(self, key, value, expiration = None):
+        """Add or replace an item, optionally giving it an *expiration* time."""
+        encoded_value = json.dumps(value)
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO items (key, value, expiration) VALUES (?, ?, ?)',
+                (key, encoded_value, expiration))
@@ -29,11 +29,15 @@
 """
 
 
-import calendar
 import datetime
+import re
 
 import isodate
 import pytz
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from .baseconv import cleanup_line, function, pipe
 from . import states
@@ -43,21 +47,190 @@ __all__ = [
     'date_to_datetime',
     'date_to_iso8601_str',
     'date_to_timestamp',
+    'dates_to_timestamps',
     'datetime_to_date',
     'datetime_to_iso8601_str',
     'datetime_to_timestamp',
+    'datetimes_to_timestamps',
     'iso8601_input_to_date',
     'iso8601_input_to_datetime',
     'iso8601_input_to_time',
     'iso8601_str_to_date',
     'iso8601_str_to_datetime',
     'iso8601_str_to_time',
+    'make_datetime_to_iso8601_str',
+    'make_datetimes_to_iso8601_strs',
+    'make_iso8601_str_to_datetime',
+    'make_time_to_iso8601_str',
+    'make_times_to_iso8601_strs',
     'set_datetime_tzinfo',
     'time_to_iso8601_str',
     'timestamp_to_date',
     'timestamp_to_datetime',
+    'timestamps_to_dates',
+    'timestamps_to_datetimes',
     ]
 
+epoch_date = datetime.date(1970, 1, 1)
+epoch_datetime = datetime.datetime(1970, 1, 1)
+tz_designator_by_utcoffset = {}
+tz_designator_re = re.compile(r'(?:Z|[+-]\d{2}(?::?\d{2})?)$')
+utcoffset_by_tz_designator = {}
+
+
+# Utility functions
+
+
+def build_datetime_formatter(precision = 0, separator = u' ', add_tz_designator = False, use_z = True):
+    """Return a function that formats a datetime (or a date) to an ISO 8601 string, without using ``strftime``.
+
+    See :func:`make_datetime_to_iso8601_str` for the meaning of parameters.
+    """
+    time_formatter = build_time_formatter(precision = precision, add_tz_designator = add_tz_designator,
+        use_z = use_z)
+    date_pattern = u'%04d-%02d-%02d' + separator.replace(u'%', u'%%')
+    midnight = datetime.time()
+
+    def format_datetime(value):
+        if isinstance(value, datetime.datetime):
+            return date_pattern % (value.year, value.month, value.day) + time_formatter(value)
+        return date_pattern % (value.year, value.month, value.day) + time_formatter(midnight)
+    return format_datetime
+
+
+def build_time_formatter(precision = 0, add_tz_designator = False, use_z = True):
+    """Return a function that formats a time (or the time of a datetime) to an ISO 8601 string, without using
+    ``strftime``.
+
+    See :func:`make_time_to_iso8601_str` for the meaning of parameters.
+    """
+    assert 0 <= precision <= 6, precision
+    if precision == 0:
+        pattern = u'%02d:%02d:%02d'
+    else:
+        pattern = u'%02d:%02d:%02d.%0{0}d'.format(precision)
+        fraction_divisor = 10 ** (6 - precision)
+
+    def format_time(value):
+        if precision == 0:
+            formatted_value = pattern % (value.hour, value.minute, value.second)
+        else:
+            formatted_value = pattern % (value.hour, value.minute, value.second, value.microsecond // fraction_divisor)
+        if add_tz_designator:
+            utcoffset = value.utcoffset()
+            if utcoffset is not None:
+                formatted_value += get_utcoffset_tz_designator(utcoffset, use_z = use_z)
+        return formatted_value
+    return format_time
+
+
+def convert_date_to_timestamp(value):
+    """Convert a date (or the date & time of a datetime, ignoring its time zone) to a JavaScript timestamp.
+
+    .. note:: This is the arithmetic equivalent of ``calendar.timegm(value.timetuple()) * 1000``.
+    """
+    if isinstance(value, datetime.datetime):
+        delta = value.replace(tzinfo = None) - epoch_datetime
+        return (delta.days * 86400 + delta.seconds) * 1000
+    return (value - epoch_date).days * 86400000
+
+
+def convert_datetime_to_timestamp(value):
+    """Convert a datetime (or a date) to a JavaScript timestamp, taking its time zone into account."""
+    if not isinstance(value, datetime.datetime):
+        return convert_date_to_timestamp(value)
+    utcoffset = value.utcoffset()
+    if utcoffset is not None:
+        value -= utcoffset
+    delta = value.replace(tzinfo = None) - epoch_datetime
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def get_fixed_offset_tzinfo(utcoffset):
+    """Return the (shared) pytz time zone for a fixed offset from UTC."""
+    minutes = utcoffset.days * 1440 + utcoffset.seconds // 60
+    return pytz.utc if minutes == 0 else pytz.FixedOffset(minutes)
+
+
+def get_tz_designator_utcoffset(tz_designator):
+    """Return the offset from UTC of an ISO 8601 time zone designator (like ``Z``, ``+01:00`` or ``-0200``).
+
+    Since a feed usually uses only a few time zones, offsets are cached by designator.
+
+    >>> get_tz_designator_utcoffset(u'+01:00')
+    datetime.timedelta(0, 3600)
+    >>> get_tz_designator_utcoffset(u'-0230')
+    datetime.timedelta(-1, 77400)
+    >>> get_tz_designator_utcoffset(u'Z')
+    datetime.timedelta(0)
+    >>> get_tz_designator_utcoffset(u'+1')
+    Traceback (most recent call last):
+    ISO8601Error:
+    >>> get_tz_designator_utcoffset(u'+25:00')
+    Traceback (most recent call last):
+    ISO8601Error:
+    >>> get_tz_designator_utcoffset(u'-0160')
+    Traceback (most recent call last):
+    ISO8601Error:
+    """
+    utcoffset = utcoffset_by_tz_designator.get(tz_designator)
+    if utcoffset is None:
+        match = isodate.isotzinfo.TZ_RE.match(tz_designator)
+        if match is None or match.end() != len(tz_designator) or not tz_designator or \
+                int(match.group('tzhour') or 0) >= 24 or int(match.group('tzmin') or 0) >= 60:
+            raise isodate.ISO8601Error('{0} is not a valid time zone designator'.format(tz_designator))
+        utcoffset = isodate.parse_tzinfo(tz_designator).utcoffset(None)
+        if len(utcoffset_by_tz_designator) < 1000:
+            utcoffset_by_tz_designator[tz_designator] = utcoffset
+    return utcoffset
+
+
+def convert_timestamps(values, convert_timestamp, state):
+    """Apply a conversion function to each JavaScript timestamp of a sequence and collect errors by index."""
+    errors = {}
+    converted_values = []
+    append = converted_values.append
+    for index, value in enumerate(values):
+        if value is None:
+            append(value)
+            continue
+        try:
+            append(convert_timestamp(value / 1000))
+        except ValueError:
+            append(value)
+            errors[index] = state._(u'Value must be a timestamp')
+    return converted_values, errors or None
+
+
+def get_utcoffset_tz_designator(utcoffset, use_z = True):
+    """Return the ISO 8601 time zone designator of an offset from UTC.
+
+    >>> get_utcoffset_tz_designator(datetime.timedelta(hours = 1))
+    u'+01:00'
+    >>> get_utcoffset_tz_designator(datetime.timedelta(hours = -2, minutes = -30))
+    u'-02:30'
+    >>> get_utcoffset_tz_designator(datetime.timedelta(0))
+    u'Z'
+    >>> get_utcoffset_tz_designator(datetime.timedelta(0), use_z = False)
+    u'+00:00'
+    """
+    key = (utcoffset, use_z)
+    tz_designator = tz_designator_by_utcoffset.get(key)
+    if tz_designator is None:
+        minutes = utcoffset.days * 1440 + utcoffset.seconds // 60
+        if minutes == 0 and use_z:
+            tz_designator = u'Z'
+        else:
+            hours, minutes = divmod(abs(minutes), 60)
+            tz_designator = u'%s%02d:%02d' % (u'-' if utcoffset.days < 0 else u'+', hours, minutes)
+        if len(tz_designator_by_utcoffset) < 1000:
+            tz_designator_by_utcoffset[key] = tz_designator
+    return tz_designator
+
+
+def is_numpy_array(value):
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
 
 # Level-1 Converters
 
@@ -107,7 +280,34 @@ def date_to_timestamp(value, state = None):
     """
     if value is None:
         return value, None
-    return int(calendar.timegm(value.timetuple()) * 1000), None
+    return convert_date_to_timestamp(value), None
+
+
+def dates_to_timestamps(values, state = None):
+    """Convert a sequence of dates to a list of JavaScript timestamps.
+
+    This is the batch version of :func:`date_to_timestamp`. ``None`` items are kept unchanged.
+
+    .. note:: When NumPy is available, an array of ``datetime64`` is converted at once to an array of ``int64``.
+
+    >>> dates_to_timestamps([datetime.date(2012, 3, 4), None, datetime.datetime(2012, 3, 4, 5, 6, 7)])
+    ([1330819200000, None, 1330837567000], None)
+    >>> dates_to_timestamps([])
+    ([], None)
+    >>> if numpy is not None:
+    ...     timestamps, error = dates_to_timestamps(numpy.array(['2012-03-04', '2012-03-05'], dtype = 'datetime64[D]'))
+    ...     assert timestamps.tolist() == [1330819200000, 1330905600000] and error is None
+    >>> dates_to_timestamps(None)
+    (None, None)
+    """
+    if values is None:
+        return values, None
+    if is_numpy_array(values) and values.dtype.kind == 'M':
+        return values.astype('datetime64[s]').astype('datetime64[ms]').astype(numpy.int64), None
+    return [
+        convert_date_to_timestamp(value) if value is not None else None
+        for value in values
+        ], None
 
 
 def datetime_to_date(value, state = None):
@@ -129,6 +329,9 @@ def datetime_to_date(value, state = None):
 def datetime_to_iso8601_str(value, state = None):
     """Convert a datetime to a string using ISO 8601 format.
 
+    .. note:: For a converter with a configurable precision, separator or time zone, see
+       :func:`make_datetime_to_iso8601_str`.
+
     >>> datetime_to_iso8601_str(datetime.datetime(2012, 3, 4, 5, 6, 7))
     (u'2012-03-04 05:06:07', None)
     >>> datetime_to_iso8601_str(datetime.date(2012, 3, 4))
@@ -136,9 +339,7 @@ def datetime_to_iso8601_str(value, state = None):
     >>> datetime_to_iso8601_str(None)
     (None, None)
     """
-    if value is None:
-        return value, None
-    return unicode(value.strftime('%Y-%m-%d %H:%M:%S')), None
+    return default_datetime_to_iso8601_str(value, state = state)
 
 
 def datetime_to_timestamp(value, state = None):
@@ -151,14 +352,38 @@ def datetime_to_timestamp(value, state = None):
     >>> datetime_to_timestamp(None)
     (None, None)
     """
-    if state is None:
-        state = states.default_state
-    if not isinstance(value, datetime.datetime):
-        return date_to_timestamp(value, state = state)
-    utcoffset = value.utcoffset()
-    if utcoffset is not None:
-        value -= utcoffset
-    return int(calendar.timegm(value.timetuple()) * 1000 + value.microsecond / 1000), None
+    if value is None:
+        return value, None
+    return convert_datetime_to_timestamp(value), None
+
+
+def datetimes_to_timestamps(values, state = None):
+    """Convert a sequence of datetimes to a list of JavaScript timestamps.
+
+    This is the batch version of :func:`datetime_to_timestamp`. ``None`` items are kept unchanged.
+
+    .. note:: When NumPy is available, an array of ``datetime64`` is converted at once to an array of ``int64``.
+
+    >>> datetimes_to_timestamps([datetime.datetime(2012, 3, 4, 5, 6, 7, 891000), None, datetime.date(2012, 3, 4)])
+    ([1330837567891, None, 1330819200000], None)
+    >>> import pytz
+    >>> datetimes_to_timestamps([datetime.datetime(2012, 3, 4, 5, 6, 7, tzinfo = pytz.FixedOffset(60))])
+    ([1330833967000], None)
+    >>> if numpy is not None:
+    ...     timestamps, error = datetimes_to_timestamps(numpy.array(['2012-03-04T05:06:07.891'],
+    ...         dtype = 'datetime64[ms]'))
+    ...     assert timestamps.tolist() == [1330837567891] and error is None
+    >>> datetimes_to_timestamps(None)
+    (None, None)
+    """
+    if values is None:
+        return values, None
+    if is_numpy_array(values) and values.dtype.kind == 'M':
+        return values.astype('datetime64[ms]').astype(numpy.int64), None
+    return [
+        convert_datetime_to_timestamp(value) if value is not None else None
+        for value in values
+        ], None
 
 
 def iso8601_str_to_date(value, state = None):
@@ -206,6 +431,9 @@ def iso8601_str_to_datetime(value, state = None):
 
     .. note:: For a converter that doesn't require a clean string, see :func:`iso8601_input_to_datetime`.
 
+    .. note:: For a converter that keeps time zones or that uses a default time zone, see
+       :func:`make_iso8601_str_to_datetime`.
+
     >>> iso8601_str_to_datetime(u'2012-03-04')
     (datetime.datetime(2012, 3, 4, 0, 0), None)
     >>> iso8601_str_to_datetime(u'20120304')
@@ -231,31 +459,7 @@ def iso8601_str_to_datetime(value, state = None):
     >>> iso8601_str_to_datetime(None)
     (None, None)
     """
-    if value is None:
-        return value, None
-    if state is None:
-        state = states.default_state
-    original_value = value
-    if u'T' not in value:
-        if u' ' in value:
-            # Accept a " " instead of a "T" for time separator.
-            value = value.replace(u' ', u'T', 1)
-        else:
-            # Time seems to be missing. Add a zero time.
-            value += u'T00:00:00'
-    # Parsing fails when time zone is preceded with a space. So we remove space before "+" and "-".
-    while u' +' in value:
-        value = value.replace(u' +', '+')
-    while u' -' in value:
-        value = value.replace(u' -', '-')
-    try:
-        value = isodate.parse_datetime(value)
-    except (isodate.ISO8601Error, ValueError):
-        return original_value, state._(u'Value must be a date-time in ISO 8601 format')
-    if value.tzinfo is not None:
-        # Convert datetime to UTC.
-        value = value.astimezone(pytz.utc).replace(tzinfo = None)
-    return value, None
+    return default_iso8601_str_to_datetime(value, state = state)
 
 
 def iso8601_str_to_time(value, state = None):
@@ -288,23 +492,231 @@ def iso8601_str_to_time(value, state = None):
         return value, None
     if state is None:
         state = states.default_state
+    original_value = value
     # Parsing fails when time zone is preceded with a space. So we remove space before "+" and "-".
     while u' +' in value:
         value = value.replace(u' +', '+')
     while u' -' in value:
         value = value.replace(u' -', '-')
+    match = tz_designator_re.search(value)
     try:
+        if match is None:
+            utcoffset = None
+        else:
+            utcoffset = get_tz_designator_utcoffset(match.group())
+            value = value[:match.start()]
         value = isodate.parse_time(value)
     except isodate.ISO8601Error:
-        return value, state._(u'Value must be a time in ISO 8601 format')
-    if value.tzinfo is not None:
-        # Convert time to UTC (using a temporary datetime).
-        datetime_value = datetime.datetime.combine(datetime.date(2, 2, 2), value)
-        datetime_value = datetime_value.astimezone(pytz.utc).replace(tzinfo = None)
-        value = datetime_value.time()
+        return original_value, state._(u'Value must be a time in ISO 8601 format')
+    if utcoffset is not None:
+        # Convert time to UTC (without using a temporary datetime).
+        seconds = (value.hour * 3600 + value.minute * 60 + value.second - utcoffset.days * 86400 -
+            utcoffset.seconds) % 86400
+        value = datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60, value.microsecond)
     return value, None
 
 
+def make_datetime_to_iso8601_str(precision = 0, separator = u' ', add_tz_designator = False, use_z = True):
+    """Return a converter that converts a datetime (or a date) to a string using ISO 8601 format.
+
+    *precision* is the number of digits of the fraction of second (from 0 to 6) and *separator* is put between date and
+    time (ISO 8601 uses ``T``). When *add_tz_designator* is true, the offset from UTC of aware datetimes is appended,
+    using ``Z`` for UTC unless *use_z* is false.
+
+    .. note:: For the default converter, see :func:`datetime_to_iso8601_str`. To convert a sequence of datetimes, use
+       :func:`make_datetimes_to_iso8601_strs`.
+
+    >>> make_datetime_to_iso8601_str()(datetime.datetime(2012, 3, 4, 5, 6, 7, 891234))
+    (u'2012-03-04 05:06:07', None)
+    >>> make_datetime_to_iso8601_str(precision = 3, separator = u'T')(datetime.datetime(2012, 3, 4, 5, 6, 7, 891234))
+    (u'2012-03-04T05:06:07.891', None)
+    >>> make_datetime_to_iso8601_str(precision = 6)(datetime.date(2012, 3, 4))
+    (u'2012-03-04 00:00:00.000000', None)
+    >>> make_datetime_to_iso8601_str(add_tz_designator = True)(datetime.datetime(1789, 7, 14, 5, 6, 7))
+    (u'1789-07-14 05:06:07', None)
+    >>> import pytz
+    >>> make_datetime_to_iso8601_str(add_tz_designator = True)(datetime.datetime(2012, 3, 4, 5, 6, 7,
+    ...     tzinfo = pytz.utc))
+    (u'2012-03-04 05:06:07Z', None)
+    >>> make_datetime_to_iso8601_str(add_tz_designator = True, use_z = False)(datetime.datetime(2012, 3, 4, 5, 6, 7,
+    ...     tzinfo = pytz.utc))
+    (u'2012-03-04 05:06:07+00:00', None)
+    >>> make_datetime_to_iso8601_str(add_tz_designator = True)(pytz.timezone('Europe/Paris').localize(
+    ...     datetime.datetime(2012, 7, 4, 5, 6, 7)))
+    (u'2012-07-04 05:06:07+02:00', None)
+    >>> make_datetime_to_iso8601_str()(None)
+    (None, None)
+    """
+    format_datetime = build_datetime_formatter(precision = precision, separator = separator,
+        add_tz_designator = add_tz_designator, use_z = use_z)
+
+    def datetime_to_iso8601_str_converter(value, state = None):
+        if value is None:
+            return value, None
+        return format_datetime(value), None
+    return datetime_to_iso8601_str_converter
+
+
+def make_datetimes_to_iso8601_strs(precision = 0, separator = u' ', add_tz_designator = False, use_z = True):
+    """Return a converter that converts a sequence of datetimes (or dates) to a list of strings using ISO 8601 format.
+
+    This is the batch version of :func:`make_datetime_to_iso8601_str`. ``None`` items are kept unchanged.
+
+    >>> make_datetimes_to_iso8601_strs()([datetime.datetime(2012, 3, 4, 5, 6, 7), None, datetime.date(2012, 3, 5)])
+    ([u'2012-03-04 05:06:07', None, u'2012-03-05 00:00:00'], None)
+    >>> make_datetimes_to_iso8601_strs(precision = 3, separator = u'T')([datetime.datetime(2012, 3, 4, 5, 6, 7)])
+    ([u'2012-03-04T05:06:07.000'], None)
+    >>> make_datetimes_to_iso8601_strs()(None)
+    (None, None)
+    """
+    format_datetime = build_datetime_formatter(precision = precision, separator = separator,
+        add_tz_designator = add_tz_designator, use_z = use_z)
+
+    def datetimes_to_iso8601_strs_converter(values, state = None):
+        if values is None:
+            return values, None
+        return [
+            format_datetime(value) if value is not None else None
+            for value in values
+            ], None
+    return datetimes_to_iso8601_strs_converter
+
+
+def make_iso8601_str_to_datetime(default_tz = None, keep_tz = False):
+    """Return a converter that converts a clean string in ISO 8601 format to a datetime.
+
+    When the string has no time zone designator, the datetime is assumed to be in time zone *default_tz*, or to be
+    naive when *default_tz* is ``None``.
+
+    When *keep_tz* is false, aware datetimes are converted to naive UTC datetimes. Otherwise they are returned with
+    their time zone: *default_tz* or a pytz fixed offset time zone.
+
+    .. note:: For the default converter, see :func:`iso8601_str_to_datetime`.
+
+    >>> make_iso8601_str_to_datetime()(u'2012-03-04 05:06:07+01:00')
+    (datetime.datetime(2012, 3, 4, 4, 6, 7), None)
+    >>> make_iso8601_str_to_datetime(keep_tz = True)(u'2012-03-04 05:06:07+01:00')
+    (datetime.datetime(2012, 3, 4, 5, 6, 7, tzinfo=pytz.FixedOffset(60)), None)
+    >>> make_iso8601_str_to_datetime(keep_tz = True)(u'2012-03-04T05:06:07.5Z')
+    (datetime.datetime(2012, 3, 4, 5, 6, 7, 500000, tzinfo=<UTC>), None)
+    >>> make_iso8601_str_to_datetime(keep_tz = True)(u'2012-03-04 05:06:07')
+    (datetime.datetime(2012, 3, 4, 5, 6, 7), None)
+    >>> paris_tz = pytz.timezone('Europe/Paris')
+    >>> make_iso8601_str_to_datetime(default_tz = paris_tz)(u'2012-07-04 05:06:07')
+    (datetime.datetime(2012, 7, 4, 3, 6, 7), None)
+    >>> make_iso8601_str_to_datetime(default_tz = paris_tz)(u'2012-07-04 05:06:07 -02:00')
+    (datetime.datetime(2012, 7, 4, 7, 6, 7), None)
+    >>> make_iso8601_str_to_datetime(default_tz = paris_tz, keep_tz = True)(u'2012-07-04 05:06:07')
+    (datetime.datetime(2012, 7, 4, 5, 6, 7, tzinfo=<DstTzInfo 'Europe/Paris' CEST+2:00:00 DST>), None)
+    >>> make_iso8601_str_to_datetime(default_tz = pytz.utc, keep_tz = True)(u'2012-07-04')
+    (datetime.datetime(2012, 7, 4, 0, 0, tzinfo=<UTC>), None)
+    >>> make_iso8601_str_to_datetime()(u'2012-03-04 05:06:07+01:00+01:00')
+    (u'2012-03-04 05:06:07+01:00+01:00', u'Value must be a date-time in ISO 8601 format')
+    >>> make_iso8601_str_to_datetime()(u'2012-03-04 05:06:07+25:00')
+    (u'2012-03-04 05:06:07+25:00', u'Value must be a date-time in ISO 8601 format')
+    >>> make_iso8601_str_to_datetime()(None)
+    (None, None)
+    """
+    # pytz time zones with daylight saving time need to localize naive datetimes.
+    localize = getattr(default_tz, 'localize', None)
+
+    def iso8601_str_to_datetime_converter(value, state = None):
+        if value is None:
+            return value, None
+        if state is None:
+            state = states.default_state
+        original_value = value
+        if u'T' not in value:
+            if u' ' in value:
+                # Accept a " " instead of a "T" for time separator.
+                value = value.replace(u' ', u'T', 1)
+            else:
+                # Time seems to be missing. Add a zero time.
+                value += u'T00:00:00'
+        # Parsing fails when time zone is preceded with a space. So we remove space before "+" and "-".
+        while u' +' in value:
+            value = value.replace(u' +', '+')
+        while u' -' in value:
+            value = value.replace(u' -', '-')
+        # Split time zone designator from date & time, to avoid building a tzinfo for each value.
+        match = tz_designator_re.search(value, value.index(u'T') + 1)
+        try:
+            if match is None:
+                utcoffset = None
+            else:
+                utcoffset = get_tz_designator_utcoffset(match.group())
+                value = value[:match.start()]
+            value = isodate.parse_datetime(value)
+        except (isodate.ISO8601Error, ValueError):
+            return original_value, state._(u'Value must be a date-time in ISO 8601 format')
+        if value.tzinfo is not None:
+            # Value contained more than one time zone designator.
+            return original_value, state._(u'Value must be a date-time in ISO 8601 format')
+        if utcoffset is not None:
+            if keep_tz:
+                return value.replace(tzinfo = get_fixed_offset_tzinfo(utcoffset)), None
+            # Convert datetime to UTC.
+            return value - utcoffset, None
+        if default_tz is None:
+            return value, None
+        value = value.replace(tzinfo = default_tz) if localize is None else localize(value)
+        if keep_tz:
+            return value, None
+        # Convert datetime to UTC.
+        return value.replace(tzinfo = None) - value.utcoffset(), None
+    return iso8601_str_to_datetime_converter
+
+
+def make_time_to_iso8601_str(precision = 0, add_tz_designator = False, use_z = True):
+    """Return a converter that converts a time to a string using ISO 8601 format.
+
+    *precision* is the number of digits of the fraction of second (from 0 to 6). When *add_tz_designator* is true, the
+    offset from UTC of aware times is appended, using ``Z`` for UTC unless *use_z* is false.
+
+    .. note:: For the default converter, see :func:`time_to_iso8601_str`. To convert a sequence of times, use
+       :func:`make_times_to_iso8601_strs`.
+
+    >>> make_time_to_iso8601_str()(datetime.time(5, 6, 7, 891234))
+    (u'05:06:07', None)
+    >>> make_time_to_iso8601_str(precision = 3)(datetime.time(5, 6, 7, 891234))
+    (u'05:06:07.891', None)
+    >>> import pytz
+    >>> make_time_to_iso8601_str(add_tz_designator = True)(datetime.time(5, 6, 7, tzinfo = pytz.FixedOffset(-150)))
+    (u'05:06:07-02:30', None)
+    >>> make_time_to_iso8601_str()(None)
+    (None, None)
+    """
+    format_time = build_time_formatter(precision = precision, add_tz_designator = add_tz_designator, use_z = use_z)
+
+    def time_to_iso8601_str_converter(value, state = None):
+        if value is None:
+            return value, None
+        return format_time(value), None
+    return time_to_iso8601_str_converter
+
+
+def make_times_to_iso8601_strs(precision = 0, add_tz_designator = False, use_z = True):
+    """Return a converter that converts a sequence of times to a list of strings using ISO 8601 format.
+
+    This is the batch version of :func:`make_time_to_iso8601_str`. ``None`` items are kept unchanged.
+
+    >>> make_times_to_iso8601_strs(precision = 6)([datetime.time(5, 6, 7, 891234), None])
+    ([u'05:06:07.891234', None], None)
+    >>> make_times_to_iso8601_strs()(None)
+    (None, None)
+    """
+    format_time = build_time_formatter(precision = precision, add_tz_designator = add_tz_designator, use_z = use_z)
+
+    def times_to_iso8601_strs_converter(values, state = None):
+        if values is None:
+            return values, None
+        return [
+            format_time(value) if value is not None else None
+            for value in values
+            ], None
+    return times_to_iso8601_strs_converter
+
+
 def set_datetime_tzinfo(tzinfo = None):
     """Return a converter that sets or clears the field tzinfo of a datetime.
 
@@ -324,14 +736,14 @@ def set_datetime_tzinfo(tzinfo = None):
 def time_to_iso8601_str(value, state = None):
     """Convert a time to a string using ISO 8601 format.
 
+    .. note:: For a converter with a configurable precision or time zone, see :func:`make_time_to_iso8601_str`.
+
     >>> time_to_iso8601_str(datetime.time(5, 6, 7))
     (u'05:06:07', None)
     >>> time_to_iso8601_str(None)
     (None, None)
     """
-    if value is None:
-        return value, None
-    return unicode(value.strftime('%H:%M:%S')), None
+    return default_time_to_iso8601_str(value, state = state)
 
 
 def timestamp_to_date(value, state = None):
@@ -389,9 +801,80 @@ def timestamp_to_datetime(value, state = None):
         return value, state._(u'Value must be a timestamp')
 
 
+def timestamps_to_dates(values, state = None):
+    """Convert a sequence of JavaScript timestamps to a list of dates.
+
+    This is the batch version of :func:`timestamp_to_date`. ``None`` items are kept unchanged and errors are reported
+    by index.
+
+    .. note:: When NumPy is available, a numeric array is converted to an array of ``datetime64[D]``, in local time
+       like the dates of a list. When some of its items are not valid timestamps, a list is returned instead.
+
+    >>> timestamps_to_dates([123456789.123, None, 1330819200000])
+    ([datetime.date(1970, 1, 2), None, datetime.date(2012, 3, 4)], None)
+    >>> timestamps_to_dates([123456789.123, 1e20])
+    ([datetime.date(1970, 1, 2), 1e+20], {1: u'Value must be a timestamp'})
+    >>> if numpy is not None:
+    ...     dates, error = timestamps_to_dates(numpy.array([123456789, 1330819200000]))
+    ...     assert dates.tolist() == timestamps_to_dates([123456789, 1330819200000])[0] and error is None
+    ...     assert timestamps_to_dates(numpy.array([123456789.123, 1e20, numpy.nan]))[1] == {
+    ...         1: u'Value must be a timestamp',
+    ...         2: u'Value must be a timestamp',
+    ...         }
+    >>> timestamps_to_dates(None)
+    (None, None)
+    """
+    if values is None:
+        return values, None
+    if state is None:
+        state = states.default_state
+    if is_numpy_array(values) and values.dtype.kind in 'fiu':
+        dates, errors = convert_timestamps(values.tolist(), datetime.date.fromtimestamp, state)
+        return (dates, errors) if errors is not None else (numpy.array(dates, dtype = 'datetime64[D]'), None)
+    return convert_timestamps(values, datetime.date.fromtimestamp, state)
+
+
+def timestamps_to_datetimes(values, state = None):
+    """Convert a sequence of JavaScript timestamps to a list of datetimes.
+
+    This is the batch version of :func:`timestamp_to_datetime`. ``None`` items are kept unchanged and errors are
+    reported by index.
+
+    .. note:: When NumPy is available, a numeric array is converted to an array of ``datetime64[us]``, in local time
+       like the datetimes of a list. When some of its items are not valid timestamps, a list is returned instead.
+
+    >>> timestamps_to_datetimes([123456789.123, None])
+    ([datetime.datetime(1970, 1, 2, 11, 17, 36, 789123), None], None)
+    >>> timestamps_to_datetimes([1e20, 123456789.123])
+    ([1e+20, datetime.datetime(1970, 1, 2, 11, 17, 36, 789123)], {0: u'Value must be a timestamp'})
+    >>> if numpy is not None:
+    ...     datetimes, error = timestamps_to_datetimes(numpy.array([123456789.123]))
+    ...     assert datetimes.tolist() == timestamps_to_datetimes([123456789.123])[0] and error is None
+    ...     assert timestamps_to_datetimes(numpy.array([-1.5e18, 123456789.123]))[1] == {
+    ...         0: u'Value must be a timestamp',
+    ...         }
+    >>> timestamps_to_datetimes(None)
+    (None, None)
+    """
+    if values is None:
+        return values, None
+    if state is None:
+        state = states.default_state
+    if is_numpy_array(values) and values.dtype.kind in 'fiu':
+        datetimes, errors = convert_timestamps(values.tolist(), datetime.datetime.fromtimestamp, state)
+        return (datetimes, errors) if errors is not None \
+            else (numpy.array(datetimes, dtype = 'datetime64[us]'), None)
+    return convert_timestamps(values, datetime.datetime.fromtimestamp, state)
+
+
 # Level-2 Converters
 
 
+# Default converters, built once and used by the functions with the same name
+default_datetime_to_iso8601_str = make_datetime_to_iso8601_str()
+default_iso8601_str_to_datetime = make_iso8601_str_to_datetime()
+default_time_to_iso8601_str = make_time_to_iso8601_str()
+
 iso8601_input_to_date = pipe(cleanup_line, iso8601_str_to_date)
 """Convert a string in ISO 8601 format to a date.
 
@@ -9,115 +9,90 @@ from Crypto.Cipher import AES
 from Crypto.Util import strxor
 from struct import pack, unpack
 
-
-def gcm_decrypt(k, iv, encrypted, auth_data, tag):
-    aes = AES.new(k)
-    h = aes.encrypt(chr(0) * aes.block_size)
-
-    if len(iv) == 12:
-        y0 = iv + '\x00\x00\x00\x01'
-    else:
-        y0 = ghash(h, '', iv)
-
-    decrypted = gctr(k, y0, encrypted)
-    s = ghash(h, auth_data, encrypted)
-
-    t = aes.encrypt(y0)
-    T = strxor.strxor(s, t)
-    if T != tag:
-        raise ValueError('Decrypted data is invalid')
-    else:
-        return decrypted
-
-
-def gcm_encrypt(k, iv, plaintext, auth_data):
-    aes = AES.new(k)
-    h = aes.encrypt(chr(0) * aes.block_size)
-
-    if len(iv) == 12:
-        y0 = iv + '\x00\x00\x00\x01'
-    else:
-        y0 = ghash(h, '', iv)
-
-    encrypted = gctr(k, y0, plaintext)
-    s = ghash(h, auth_data, encrypted)
-
-    t = aes.encrypt(y0)
-    T = strxor.strxor(s, t)
-    return (encrypted, T)
-
-
-def gcm_gf_mult(a, b):
-    mask = [0x80, 0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01]
-    poly = [0x00, 0xe1]
-
-    Z = [0] * 16
-    V = [c for c in a]
-
-    for x in range(128):
-        if b[x >> 3] & mask[x & 7]:
-            Z = [V[y] ^ Z[y] for y in range(16)]
-        bit = V[15] & 1
-        V = gcm_rightshift(V)
-        V[0] ^= poly[bit]
-    return Z
-
-
-def gcm_rightshift(vec):
-    for x in range(15, 0, -1):
-        c = vec[x] >> 1
-        c |= (vec[x - 1] << 7) & 0x80
-        vec[x] = c
-    vec[0] >>= 1
-    return vec
-
-
-def ghash(h, auth_data, data):
-    u = (16 - len(data)) % 16
-    v = (16 - len(auth_data)) % 16
-
-    x = auth_data + chr(0) * v + data + chr(0) * u
-    x += pack('>QQ', len(auth_data) * 8, len(data) * 8)
-
-    y = [0] * 16
-    vec_h = [ord(c) for c in h]
-
-    for i in range(0, len(x), 16):
-        block = [ord(c) for c in x[i:i + 16]]
-        y = [y[j] ^ block[j] for j in range(16)]
-        y = gcm_gf_mult(y, vec_h)
-
-    return ''.join(chr(c) for c in y)
-
-
-def gctr(k, icb, plaintext):
-    y = ''
-    if len(plaintext) == 0:
-        return y
-
-    aes = AES.new(k)
-    cb = icb
-
-    for i in range(0, len(plaintext), aes.block_size):
-        cb = inc32(cb)
-        encrypted = aes.encrypt(cb)
-        plaintext_block = plaintext[i:i + aes.block_size]
-        y += strxor.strxor(plaintext_block, encrypted[:len(plaintext_block)])
-
-    return y
-
-
-def hex_to_str(s):
-    return ''.join(s.split()).decode('hex')
-
-
-def inc32(block):
-    counter, = unpack('>L', block[12:])
-    counter += 1
-    return block[:12] + pack('>L', counter)
-
-
-def main():
+from .strings import constant_time_compare
+
+
+gcm_byte_shifts = range(0, 128, 8)
+gcm_r = 0xe1 << 120
+gcm_reduction_table = [0] * 256  # Reduction of the 8 low bits shifted out when multiplying by x^8
+for low_bits in range(256):
+    reduction = low_bits
+    for bit_index in range(8):
+        reduction = (reduction >> 1) ^ gcm_r if reduction & 1 else reduction >> 1
+    gcm_reduction_table[low_bits] = reduction
+del bit_index, low_bits, reduction
+ghash_table_by_h = {}
+ghash_table_cache_max_size = 64
+native_aes_gcm_mode = getattr(AES, 'MODE_GCM', None)  # Not available in PyCrypto 2.x, only in its successors
+backend = 'python' if native_aes_gcm_mode is None else 'native'
+
+
+class PythonGcmCipher(object):
+    # Incremental pure Python AES-GCM, with the same methods as the native GCM ciphers: data can be encrypted (or
+    # decrypted) in several chunks of any length, before computing (or verifying) the tag.
+    auth_data_length = 0
+    data_length = 0
+    ghash_buffer = ''
+    keystream = ''
+    y = 0
+
+    def __init__(self, k, iv, auth_data):
+        self.aes = AES.new(k, AES.MODE_ECB)
+        h = self.aes.encrypt(chr(0) * self.aes.block_size)
+        self.table = get_ghash_table(h)
+        if len(iv) == 12:
+            self.y0 = iv + '\x00\x00\x00\x01'
+        else:
+            self.y0 = ghash(h, '', iv)
+        self.counter_prefix = self.y0[:12]
+        self.counter, = unpack('>L', self.y0[12:])
+        self.auth_data_length = len(auth_data)
+        self.y = ghash_blocks(0, self.table, auth_data + chr(0) * ((16 - len(auth_data)) % 16))
+
+    def decrypt(self, encrypted):
+        self.update_ghash(encrypted)
+        return self.xor_keystream(encrypted)
+
+    def digest(self):
+        x = self.ghash_buffer + chr(0) * ((16 - len(self.ghash_buffer)) % 16)
+        x += pack('>QQ', self.auth_data_length * 8, self.data_length * 8)
+        y = ghash_blocks(self.y, self.table, x)
+        return strxor.strxor(pack('>QQ', y >> 64, y & 0xffffffffffffffff), self.aes.encrypt(self.y0))
+
+    def encrypt(self, plaintext):
+        encrypted = self.xor_keystream(plaintext)
+        self.update_ghash(encrypted)
+        return encrypted
+
+    def update_ghash(self, encrypted):
+        self.data_length += len(encrypted)
+        x = self.ghash_buffer + encrypted
+        blocks_length = len(x) & ~15
+        self.y = ghash_blocks(self.y, self.table, x[:blocks_length])
+        self.ghash_buffer = x[blocks_length:]
+
+    def verify(self, tag):
+        if not constant_time_compare(self.digest(), tag):
+            raise ValueError('Decrypted data is invalid')
+
+    def xor_keystream(self, data):
+        if not data:
+            return ''
+        missing_length = len(data) - len(self.keystream)
+        if missing_length > 0:
+            blocks_count = (missing_length + 15) >> 4
+            self.keystream += self.aes.encrypt(''.join(
+                self.counter_prefix + pack('>L', (self.counter + i) & 0xffffffff)
+                for i in xrange(1, blocks_count + 1)
+                ))
+            self.counter += blocks_count
+        keystream = self.keystream[:len(data)]
+        self.keystream = self.keystream[len(data):]
+        return strxor.strxor(data, keystream)
+
+
+def check_backend(gcm_encrypt, gcm_decrypt):
+    # Known-answer tests, run against every available backend.
     #http://www.ieee802.org/1/files/public/docs2011/bn-randall-test-vectors-0511-v1.pdf
     k = hex_to_str('''AD7A2BD03EAC835A6F620FDCB506B345''')
     p = ''
@@ -157,7 +132,7 @@ def main():
         59E60E6F05009D12FB1E37''')
     ciphertext = data[12 + 40:-16]
     tag = data[-16:]
-    print repr(gcm_decrypt(key, '', ciphertext, '', tag))
+    assert gcm_decrypt(key, '', ciphertext, '', tag).startswith('bplist00')
 
     # Test vectors from NIST GCM spec
     # http://csrc.nist.gov/groups/ST/toolkit/BCM/documents/proposedmodes/gcm/gcm-spec.pdf
@@ -377,6 +352,219 @@ def main():
         5a8def2f0c9e53f1f75d7853659e2a20eeb2b22aafde6419a058ab4f6f746bf4
         0fc0c3b780f244452da3ebf1c5d82cdea2418997200ef82e44ae7e3f''')
     assert t == hex_to_str('''a44a8266ee1c8eb0c8b5d4cf5ae9f19a''')
+    assert gcm_decrypt(k, iv, c, a, t) == p
+    try:
+        gcm_decrypt(k, iv, c, a, t[:-1] + chr(ord(t[-1]) ^ 1))
+    except ValueError:
+        pass
+    else:
+        assert False, 'Tampered tag was accepted'
+
+
+def gcm_decrypt(k, iv, encrypted, auth_data, tag):
+    if native_aes_gcm_mode is not None:
+        return native_gcm_decrypt(k, iv, encrypted, auth_data, tag)
+    return python_gcm_decrypt(k, iv, encrypted, auth_data, tag)
+
+
+def gcm_encrypt(k, iv, plaintext, auth_data):
+    if native_aes_gcm_mode is not None:
+        return native_gcm_encrypt(k, iv, plaintext, auth_data)
+    return python_gcm_encrypt(k, iv, plaintext, auth_data)
+
+
+def gcm_gf_mult(a, b):
+    # Bitwise multiplication of two elements of GF(2^128), stored as 128 bits integers (bit 0 of GCM being the most
+    # significant bit). Slow reference implementation, used to check the table-driven GHASH.
+    z = 0
+    for i in range(127, -1, -1):
+        if (b >> i) & 1:
+            z ^= a
+        a = gcm_mult_x(a)
+    return z
+
+
+def gcm_mult_x(a):
+    return (a >> 1) ^ gcm_r if a & 1 else a >> 1
+
+
+def get_ghash_table(h):
+    # Shoup's 8-bit table: table[b] is the product of H with the polynomial of byte b.
+    table = ghash_table_by_h.get(h)
+    if table is None:
+        h_high, h_low = unpack('>QQ', h)
+        table = [0] * 256
+        table[0x80] = (h_high << 64) | h_low
+        i = 0x40
+        while i:
+            table[i] = gcm_mult_x(table[i << 1])
+            i >>= 1
+        i = 2
+        while i < 256:
+            for j in range(1, i):
+                table[i + j] = table[i] ^ table[j]
+            i <<= 1
+        if len(ghash_table_by_h) >= ghash_table_cache_max_size:
+            ghash_table_by_h.clear()
+        ghash_table_by_h[h] = table
+    return table
+
+
+def ghash(h, auth_data, data):
+    u = (16 - len(data)) % 16
+    v = (16 - len(auth_data)) % 16
+
+    x = auth_data + chr(0) * v + data + chr(0) * u
+    x += pack('>QQ', len(auth_data) * 8, len(data) * 8)
+
+    y = ghash_blocks(0, get_ghash_table(h), x)
+    return pack('>QQ', y >> 64, y & 0xffffffffffffffff)
+
+
+def ghash_blocks(y, table, x):
+    # Update GHASH state y with the 16 bytes blocks of x.
+    if not x:
+        return y
+    reduction_table = gcm_reduction_table
+    words = unpack('>{0}Q'.format(len(x) >> 3), x)
+    for i in range(0, len(words), 2):
+        y ^= (words[i] << 64) | words[i + 1]
+        # Horner's rule on the bytes of y, from the last one (highest degree) to the first one.
+        z = 0
+        for shift in gcm_byte_shifts:
+            z = (z >> 8) ^ reduction_table[z & 0xff] ^ table[(y >> shift) & 0xff]
+        y = z
+    return y
+
+
+def gctr(k, icb, plaintext):
+    if len(plaintext) == 0:
+        return ''
+
+    # Encrypt all the counter blocks at once (ECB mode accepts several blocks), then XOR the whole keystream with the
+    # plaintext.
+    aes = AES.new(k, AES.MODE_ECB)
+    prefix = icb[:12]
+    counter, = unpack('>L', icb[12:])
+    blocks_count = (len(plaintext) + 15) >> 4
+    keystream = aes.encrypt(''.join(
+        prefix + pack('>L', (counter + i) & 0xffffffff)
+        for i in xrange(1, blocks_count + 1)
+        ))
+    return strxor.strxor(plaintext, keystream[:len(plaintext)])
+
+
+def hex_to_str(s):
+    return ''.join(s.split()).decode('hex')
+
+
+def inc32(block):
+    counter, = unpack('>L', block[12:])
+    counter += 1
+    return block[:12] + pack('>L', counter)
+
+
+def main():
+    # Table-driven GHASH must match the bitwise multiplication.
+    h = hex_to_str('''66e94bd4ef8a2c3b884cfa59ca342b2e''')
+    x = hex_to_str('''0388dace60b6a392f328c2b971b2fe780388dace60b6a392f328c2b971b2fe78''')
+    h_int = int(h.encode('hex'), 16)
+    y = 0
+    for i in range(0, len(x), 16):
+        y = gcm_gf_mult(y ^ int(x[i:i + 16].encode('hex'), 16), h_int)
+    y = gcm_gf_mult(y ^ (len(x) * 8), h_int)
+    assert ghash(h, '', x) == hex_to_str('{0:032x}'.format(y))
+
+    print 'Selected backend: {0}'.format(backend)
+    check_backend(python_gcm_encrypt, python_gcm_decrypt)
+    if native_aes_gcm_mode is not None:
+        check_backend(native_gcm_encrypt, native_gcm_decrypt)
+    check_backend(gcm_encrypt, gcm_decrypt)
+
+    # Incremental ciphers must give the same results as one-shot encryption, whatever the size of the chunks.
+    k = hex_to_str('''feffe9928665731c6d6a8f9467308308''')
+    iv = hex_to_str('''cafebabefacedbaddecaf888''')
+    a = hex_to_str('''feedfacedeadbeeffeedfacedeadbeefabaddad2''')
+    p = ''.join(chr(i % 251) for i in range(1000))
+    c, t = gcm_encrypt(k, iv, p, a)
+    ciphers = [PythonGcmCipher]
+    if native_aes_gcm_mode is not None:
+        ciphers.append(native_gcm_cipher)
+    for cipher_constructor in ciphers:
+        for chunk_size in (1, 7, 16, 33, 1000):
+            cipher = cipher_constructor(k, iv, a)
+            assert ''.join(cipher.encrypt(p[i:i + chunk_size]) for i in range(0, len(p), chunk_size)) == c
+            assert cipher.digest() == t
+            cipher = cipher_constructor(k, iv, a)
+            assert ''.join(cipher.decrypt(c[i:i + chunk_size]) for i in range(0, len(c), chunk_size)) == p
+            cipher.verify(t)
+
+
+def native_gcm_cipher(k, iv, auth_data):
+    cipher = AES.new(k, native_aes_gcm_mode, nonce = iv)
+    cipher.update(auth_data)
+    return cipher
+
+
+def native_gcm_decrypt(k, iv, encrypted, auth_data, tag):
+    if not iv:
+        # Native GCM modes reject empty IVs.
+        return python_gcm_decrypt(k, iv, encrypted, auth_data, tag)
+    try:
+        return native_gcm_cipher(k, iv, auth_data).decrypt_and_verify(encrypted, tag)
+    except ValueError:
+        raise ValueError('Decrypted data is invalid')
+
+
+def native_gcm_encrypt(k, iv, plaintext, auth_data):
+    if not iv:
+        # Native GCM modes reject empty IVs.
+        return python_gcm_encrypt(k, iv, plaintext, auth_data)
+    return native_gcm_cipher(k, iv, auth_data).encrypt_and_digest(plaintext)
+
+
+def new_gcm_cipher(k, iv, auth_data):
+    # Return an incremental GCM cipher, with methods encrypt, decrypt, digest & verify.
+    if native_aes_gcm_mode is not None and iv:
+        return native_gcm_cipher(k, iv, auth_data)
+    return PythonGcmCipher(k, iv, auth_data)
+
+
+def python_gcm_decrypt(k, iv, encrypted, auth_data, tag):
+    aes = AES.new(k, AES.MODE_ECB)
+    h = aes.encrypt(chr(0) * aes.block_size)
+
+    if len(iv) == 12:
+        y0 = iv + '\x00\x00\x00\x01'
+    else:
+        y0 = ghash(h, '', iv)
+
+    decrypted = gctr(k, y0, encrypted)
+    s = ghash(h, auth_data, encrypted)
+
+    t = aes.encrypt(y0)
+    T = strxor.strxor(s, t)
+    if not constant_time_compare(T, tag):
+        raise ValueError('Decrypted data is invalid')
+    else:
+        return decrypted
+
+
+def python_gcm_encrypt(k, iv, plaintext, auth_data):
+    aes = AES.new(k, AES.MODE_ECB)
+    h = aes.encrypt(chr(0) * aes.block_size)
+
+    if len(iv) == 12:
+        y0 = iv + '\x00\x00\x00\x01'
+    else:
+        y0 = ghash(h, '', iv)
+
+    encrypted = gctr(k, y0, plaintext)
+    s = ghash(h, auth_data, encrypted)
+
+    t = aes.encrypt(y0)
+    T = strxor.strxor(s, t)
+    return (encrypted, T)
 
 
 if __name__ == '__main__':
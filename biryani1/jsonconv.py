@@ -22,28 +22,55 @@
 # limitations under the License.
 
 
-"""JSON Related Converters"""
+"""JSON Related Converters
+
+JSON is encoded & decoded by the standard ``json`` module. Use the *backend* parameter of converters (or change
+:data:`json_backend`) to choose another backend (any module with the same API as ``json``), like the faster
+`simplejson <http://pypi.python.org/pypi/simplejson>`_.
+
+.. warning:: The defaults of simplejson differ from the ones of ``json``: For example, it encodes named tuples as JSON
+   objects (instead of arrays), and may decode ASCII strings to ``str`` (the converters of this module always convert
+   the strings they are given to unicode before decoding them).
+"""
 
 
 import json
 
-from .baseconv import cleanup_line, pipe
+from .baseconv import cleanup_line, N_, pipe, struct, test_isinstance
 from . import states
 
 
 __all__ = [
+    'json_backend',
     'make_input_to_json',
+    'make_input_to_json_struct',
     'make_json_to_str',
     'make_str_to_json',
+    'make_str_to_json_struct',
     ]
 
 
+json_backend = json
+"""Module used to encode & decode JSON by the converters created without a *backend*.
+
+To use another backend by default, change it before creating converters.
+"""
+# Names of the positional parameters of json.dumps() & json.loads(), used to convert them to keyword parameters
+json_dumps_parameters_name = ('skipkeys', 'ensure_ascii', 'check_circular', 'allow_nan', 'cls', 'indent', 'separators',
+    'encoding', 'default', 'sort_keys')
+json_loads_parameters_name = ('encoding', 'cls', 'object_hook', 'parse_float', 'parse_int', 'parse_constant',
+    'object_pairs_hook')
+
+
 # Level-1 Converters
 
 
 def make_json_to_str(*args, **kwargs):
     """Return a converter that encodes a JSON data to a string.
 
+    Parameters are the ones of ``json.dumps()``, plus an optional *backend*. The JSON encoder is configured once, when
+    the converter is created.
+
     >>> make_json_to_str()({u'a': 1, u'b': [2, u'three']})
     (u'{"a": 1, "b": [2, "three"]}', None)
     >>> make_json_to_str()(u'Hello World')
@@ -54,18 +81,27 @@ def make_json_to_str(*args, **kwargs):
     (set([1, 2, 3]), u'Invalid JSON')
     >>> make_json_to_str()(u'')
     (u'""', None)
+    >>> make_json_to_str(None, False, backend = json)(u'\xe9t\xe9')
+    (u'"\\xe9t\\xe9"', None)
     >>> make_json_to_str()(None)
     (None, None)
     """
+    backend = kwargs.pop('backend', None) or json_backend
+    kwargs.update(zip(json_dumps_parameters_name, args))
+    encoder_class = kwargs.pop('cls', None) or backend.JSONEncoder
+    encode = encoder_class(**kwargs).encode
+
     def json_to_str(value, state = None):
         if value is None:
             return value, None
         if state is None:
             state = states.default_state
         try:
-            value_str = unicode(json.dumps(value, *args, **kwargs))
+            value_str = encode(value)
         except TypeError:
             return value, state._(u'Invalid JSON')
+        if isinstance(value_str, str):
+            value_str = value_str.decode('utf-8')
         return value_str, None
     return json_to_str
 
@@ -75,6 +111,9 @@ def make_str_to_json(*args, **kwargs):
 
     .. note:: For a converter that doesn't require a clean string, see :func:`make_input_to_json`.
 
+    Parameters are the ones of ``json.loads()``, plus an optional *backend*. The JSON decoder is configured once, when
+    the converter is created.
+
     >>> make_str_to_json()(u'{"a": 1, "b": [2, "three"]}')
     ({u'a': 1, u'b': [2, u'three']}, None)
     >>> make_str_to_json()(u'null')
@@ -85,24 +124,209 @@ def make_str_to_json(*args, **kwargs):
     (u'{"a": 1, "b":', u'Invalid JSON')
     >>> make_str_to_json()(u'')
     (u'', u'Invalid JSON')
+    >>> make_str_to_json(backend = json)('{"a": "\\u00e9t\xc3\xa9"}')
+    ({u'a': u'\\xe9t\\xe9'}, None)
     >>> make_str_to_json()(None)
     (None, None)
     """
+    backend = kwargs.pop('backend', None) or json_backend
+    kwargs.update(zip(json_loads_parameters_name, args))
+    decoder_class = kwargs.pop('cls', None) or backend.JSONDecoder
+    decode = decoder_class(**kwargs).decode
+    # The standard json module always decodes strings to unicode, but other backends may keep ASCII strings as str.
+    decode_str = backend is not json
+
     def str_to_json(value, state = None):
         if value is None:
             return value, None
         if state is None:
             state = states.default_state
-        if isinstance(value, str):
-            # Ensure that json.loads() uses unicode strings.
-            value = value.decode('utf-8')
         try:
-            return json.loads(value, *args, **kwargs), None
+            if decode_str and isinstance(value, str):
+                # Ensure that the backend uses unicode strings.
+                value = value.decode('utf-8')
+            return decode(value), None
         except ValueError:
             return value, state._(u'Invalid JSON')
     return str_to_json
 
 
+def make_str_to_json_struct(converters, backend = None, constructor = None, default = None, drop_none_values = False,
+        skip_missing_items = False, **kwargs):
+    """Return a converter that decodes a clean string to a JSON object and converts its items, while parsing it.
+
+    This converter is a faster equivalent of ``pipe(make_str_to_json(), test_isinstance(dict), struct(converters))``:
+    The string is parsed item by item and each item is converted as soon as its value has been parsed, so the decoded
+    object is never built (nor walked) before being converted. When *default* is ``'drop'``, the values of unknown
+    items are dropped as soon as they are parsed, without being converted.
+
+    .. note:: Parsing item by item uses the internals of the backend (``scan_once`` method of its decoder,
+       ``decoder.scanstring`` function & ``decoder.WHITESPACE`` regular expression), like the ones of the standard
+       ``json`` module. When the backend doesn't have them, the converter falls back to the equivalent pipe.
+
+    .. note:: For a converter that doesn't require a clean string, see :func:`make_input_to_json_struct`.
+
+    Parameters *constructor*, *default*, *drop_none_values* & *skip_missing_items* are the ones of
+    :func:`biryani1.baseconv.struct` (the order of converted items follows the order of the JSON object). Other
+    parameters are the ones of :func:`make_str_to_json`, and are used to decode the values of items.
+
+    >>> from biryani1.baseconv import cleanup_line, input_to_int, not_none, pipe, test_isinstance
+    >>> converter = make_str_to_json_struct(dict(
+    ...     age = pipe(test_isinstance(int), not_none),
+    ...     name = pipe(test_isinstance(basestring), cleanup_line),
+    ...     ))
+    >>> converter(u'{"name": " John Doe ", "age": 72}')
+    ({u'age': 72, u'name': u'John Doe'}, None)
+    >>> converter(u'{"name": "John Doe", "age": "72", "phone": "+33 9 12 34 56 78"}')
+    ({u'phone': u'+33 9 12 34 56 78', u'age': u'72', u'name': u'John Doe'}, {u'phone': u'Unexpected item', \
+u'age': u"Value is not an instance of <type 'int'>"})
+    >>> converter(u'{"name": "John Doe"}')
+    ({'age': None, u'name': u'John Doe'}, {'age': u'Missing value'})
+    >>> converter(u'{"name": "John Doe", "age": 72')
+    (u'{"name": "John Doe", "age": 72', u'Invalid JSON')
+    >>> converter(u'[1, 2, 3]')
+    ([1, 2, 3], u'Value is not a JSON object')
+    >>> converter(u'Hello World')
+    (u'Hello World', u'Invalid JSON')
+    >>> converter(u'')
+    (u'', u'Invalid JSON')
+    >>> converter(u'null')
+    (None, None)
+    >>> converter(None)
+    (None, None)
+    >>> make_str_to_json_struct(
+    ...     dict(
+    ...         age = input_to_int,
+    ...         name = cleanup_line,
+    ...         ),
+    ...     default = 'drop',
+    ...     drop_none_values = True,
+    ...     )(u'{"name": " ", "age": "72", "friends": [{"name": "Jane Doe"}]}')
+    ({u'age': 72}, None)
+    >>> import collections
+    >>> from biryani1.baseconv import noop
+    >>> make_str_to_json_struct(
+    ...     dict(
+    ...         age = input_to_int,
+    ...         name = cleanup_line,
+    ...         ),
+    ...     constructor = collections.OrderedDict,
+    ...     default = noop,
+    ...     object_pairs_hook = collections.OrderedDict,
+    ...     )('{"name": "John Doe", "address": {"city": "Paris", "country": "France"}}')
+    ...     # doctest: +NORMALIZE_WHITESPACE
+    (OrderedDict([(u'name', u'John Doe'), (u'address', OrderedDict([(u'city', u'Paris'), (u'country', u'France')])),
+        ('age', None)]), None)
+
+    Usage with a backend that doesn't expose its parser:
+
+    >>> class MinimalBackend(object):
+    ...     JSONDecoder = json.JSONDecoder
+    >>> converter = make_str_to_json_struct(dict(age = input_to_int), backend = MinimalBackend)
+    >>> converter(u'{"age": "72"}')
+    ({u'age': 72}, None)
+    >>> converter(u'[1, 2, 3]')
+    ([1, 2, 3], u'Value is not a JSON object')
+    >>> converter(u'')
+    (u'', u'Invalid JSON')
+    """
+    backend = backend or json_backend
+    if constructor is None:
+        constructor = type(converters)
+    converters = constructor(
+        (name, converter)
+        for name, converter in (converters or {}).iteritems()
+        if converter is not None
+        )
+    decoder_class = kwargs.pop('cls', None) or backend.JSONDecoder
+    decoder = decoder_class(**kwargs)
+    backend_decoder = getattr(backend, 'decoder', None)
+    if not all(hasattr(decoder, name) for name in ('encoding', 'scan_once', 'strict')) or \
+            not all(hasattr(backend_decoder, name) for name in ('scanstring', 'WHITESPACE')):
+        return pipe(
+            make_str_to_json(backend = backend, cls = decoder_class, **kwargs),
+            test_isinstance(dict, error = N_(u'Value is not a JSON object')),
+            struct(converters, constructor = constructor, default = default, drop_none_values = drop_none_values,
+                keep_value_order = True, skip_missing_items = skip_missing_items),
+            )
+    decode = decoder.decode
+    scan_once = decoder.scan_once
+    scanstring = backend_decoder.scanstring
+    skip_whitespace = backend_decoder.WHITESPACE.match
+
+    def str_to_json_struct(value, state = None):
+        if value is None:
+            return value, None
+        if state is None:
+            state = states.default_state
+        # Ensure that keys & values are decoded to unicode strings.
+        s = value.decode('utf-8') if isinstance(value, str) else value
+        index = skip_whitespace(s, 0).end()
+        if s[index:index + 1] != u'{':
+            # Not a JSON object: Parse the whole value, to give the same results as make_str_to_json().
+            try:
+                decoded_value = decode(s)
+            except ValueError:
+                return value, state._(u'Invalid JSON')
+            if decoded_value is None:
+                return None, None
+            return decoded_value, state._(u'Value is not a JSON object')
+        errors = constructor()
+        converted_values = constructor()
+        present_names = set()
+        try:
+            index = skip_whitespace(s, index + 1).end()
+            if s[index:index + 1] == u'}':
+                index += 1
+            else:
+                while True:
+                    if s[index:index + 1] != u'"':
+                        raise ValueError('Expecting property name')
+                    name, index = scanstring(s, index + 1, decoder.encoding, decoder.strict)
+                    index = skip_whitespace(s, index).end()
+                    if s[index:index + 1] != u':':
+                        raise ValueError('Expecting : delimiter')
+                    item_value, index = scan_once(s, skip_whitespace(s, index + 1).end())
+                    present_names.add(name)
+                    # A duplicate item replaces the previous one.
+                    converted_values.pop(name, None)
+                    errors.pop(name, None)
+                    converter = converters.get(name)
+                    if converter is None and default is None:
+                        errors[name] = state._(u'Unexpected item')
+                        converted_values[name] = item_value
+                    elif converter is not None or default != 'drop':
+                        if converter is None:
+                            converter = default
+                        item_value, error = converter(item_value, state = state)
+                        if item_value is not None or not drop_none_values or drop_none_values == 'missing':
+                            converted_values[name] = item_value
+                        if error is not None:
+                            errors[name] = error
+                    index = skip_whitespace(s, index).end()
+                    delimiter = s[index:index + 1]
+                    index = skip_whitespace(s, index + 1).end()
+                    if delimiter == u'}':
+                        break
+                    if delimiter != u',':
+                        raise ValueError('Expecting , delimiter')
+            if skip_whitespace(s, index).end() != len(s):
+                raise ValueError('Extra data')
+        except (StopIteration, ValueError):
+            return value, state._(u'Invalid JSON')
+        if not skip_missing_items:
+            for name, converter in converters.iteritems():
+                if name in present_names:
+                    continue
+                item_value, error = converter(None, state = state)
+                if item_value is not None or not drop_none_values:
+                    converted_values[name] = item_value
+                if error is not None:
+                    errors[name] = error
+        return converted_values, errors or None
+    return str_to_json_struct
+
+
 # Level-2 Converters
 
 
@@ -126,3 +350,20 @@ def make_input_to_json(*args, **kwargs):
         cleanup_line,
         make_str_to_json(*args, **kwargs),
         )
+
+
+def make_input_to_json_struct(converters, **kwargs):
+    """Return a converter that decodes a string to a JSON object and converts its items, while parsing it.
+
+    See :func:`make_str_to_json_struct` for the parameters.
+
+    >>> from biryani1.baseconv import input_to_int
+    >>> make_input_to_json_struct(dict(age = input_to_int))(u'   {"age": "72"}   ')
+    ({u'age': 72}, None)
+    >>> make_input_to_json_struct(dict(age = input_to_int))(u'   ')
+    (None, None)
+    """
+    return pipe(
+        cleanup_line,
+        make_str_to_json_struct(converters, **kwargs),
+        )
@@ -25,12 +25,22 @@
 """Converters for JSON Web Keys (JWK)"""
 
 
+import itertools
+import json
+import os
+import threading
+import time
+
+from Crypto.PublicKey import RSA
+from Crypto.Util import number
+
 from .base64conv import make_base64url_to_bytes
-from .baseconv import (function, noop, not_none, pipe, struct, switch, test_conv, test_in, test_isinstance,
+from .baseconv import (check, function, noop, not_none, pipe, struct, switch, test_conv, test_in, test_isinstance,
     uniform_sequence)
 
 
 __all__ = [
+    'JsonWebKeySet',
     'json_to_json_web_key',
     'json_to_json_web_key_set',
     ]
@@ -171,3 +181,181 @@ json_to_json_web_key_set = pipe(
                'use': None}]},
      None)
     """
+
+
+base64url_to_bytes = make_base64url_to_bytes(add_padding = True)
+
+
+class JsonWebKeySet(object):
+    """Index of the keys of a JSON Web Key Set, validated once, for constant time lookups by ``kid``, ``alg`` &
+    ``use``.
+
+    The RSA public key objects of the set are built when the set is loaded. When the set is read from a file, it is
+    reloaded (atomically, so that concurrent lookups always see either the old or the new set) when the file changes:
+    either explicitly by calling :meth:`reload`, or automatically by lookups when a *reload_interval* (in seconds) is
+    given (it is ignored when the set is not read from a file).
+
+    >>> from Crypto.PublicKey import RSA
+    >>> from Crypto.Util import number
+    >>> from biryani1.base64conv import make_bytes_to_base64url
+    >>> bytes_to_base64url = make_bytes_to_base64url(remove_padding = True)
+    >>> rsa_key = RSA.generate(1024)
+    >>> key_set = JsonWebKeySet(dict(jwk = [
+    ...     dict(
+    ...         alg = u'EC',
+    ...         crv = u'P-256',
+    ...         kid = u'1',
+    ...         use = u'enc',
+    ...         x = u'MKBCTNIcKUSDii11ySs3526iDZ8AiTo7Tu6KPAqv7D4',
+    ...         y = u'4Etl6SRW2YiLUrN5vfvVHuhp7x8PxltmWWlbbM4IFyM',
+    ...         ),
+    ...     dict(
+    ...         alg = u'RSA',
+    ...         exp = check(bytes_to_base64url)(number.long_to_bytes(rsa_key.e)),
+    ...         kid = u'2011-04-29',
+    ...         mod = check(bytes_to_base64url)(number.long_to_bytes(rsa_key.n)),
+    ...         ),
+    ...     ]))
+    >>> len(key_set)
+    2
+    >>> key_set.get(kid = u'1')['crv']
+    u'P-256'
+    >>> key_set.get(alg = u'RSA')['kid']
+    u'2011-04-29'
+    >>> print key_set.get(kid = u'1', use = u'sig')
+    None
+    >>> key_set.get_rsa_public_key(kid = u'2011-04-29') == rsa_key.publickey()
+    True
+    >>> print key_set.get_rsa_public_key(kid = u'1')
+    None
+    >>> key_set.get_signature_item(kid = u'2011-04-29')[1] == rsa_key.publickey()
+    True
+    >>> key_set.get_signature_item(kid = u'1')
+    (None, None)
+    >>> print JsonWebKeySet(dict(jwk = []), reload_interval = 60).get(kid = u'1')
+    None
+
+    Loading a key set from a file:
+
+    >>> import json, os, tempfile
+    >>> file_descriptor, file_path = tempfile.mkstemp(suffix = '.json')
+    >>> written_size = os.write(file_descriptor, json.dumps(dict(jwk = [key_set.get(kid = u'1')])))
+    >>> os.close(file_descriptor)
+    >>> now = [1000]
+    >>> file_key_set = JsonWebKeySet(clock = lambda: now[0], file_path = file_path, reload_interval = 60)
+    >>> file_key_set.get(kid = u'1')['use']
+    u'enc'
+    >>> with open(file_path, 'w') as json_file:
+    ...     json.dump(dict(jwk = [dict(key_set.get(kid = u'1'), kid = u'2')]), json_file)
+    >>> os.utime(file_path, (0, 0))
+    >>> file_key_set.get(kid = u'1')['use']
+    u'enc'
+    >>> now[0] += 60
+    >>> print file_key_set.get(kid = u'1')
+    None
+    >>> file_key_set.get(kid = u'2')['use']
+    u'enc'
+    >>> os.remove(file_path)
+    """
+    clock = None
+    file_modification_time = None
+    file_path = None
+    index = None  # Dictionary (replaced at each load) of ``(key, rsa_public_key)`` couples by (kid, alg, use)
+    keys = None
+    next_reload_check = None
+    reload_interval = None
+
+    def __init__(self, json_web_key_set = None, clock = None, file_path = None, reload_interval = None, state = None):
+        assert json_web_key_set is None or file_path is None
+        self.clock = clock or time.time
+        self.lock = threading.Lock()
+        self.reload_interval = reload_interval
+        if file_path is not None:
+            self.file_path = file_path
+            self.reload(state = state)
+        else:
+            self.load(json_web_key_set or dict(jwk = []), state = state)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, kid = None, alg = None, use = None):
+        """Return the key matching given criteria (``None`` matching any value), or ``None`` when no key matches.
+
+        When several keys match, the last one of the set is returned.
+        """
+        return self.get_item(kid, alg, use)[0]
+
+    def get_item(self, kid = None, alg = None, use = None):
+        """Return the ``(key, rsa_public_key)`` couple matching given criteria, or ``(None, None)``."""
+        if self.file_path is not None and self.reload_interval is not None and \
+                self.clock() >= self.next_reload_check:
+            self.reload()
+        return self.index.get((kid, alg, use), (None, None))
+
+    def get_rsa_public_key(self, kid = None, use = None):
+        """Return the RSA public key object of the key matching given criteria, or ``None``.
+
+        Key objects are shared and must be used read-only.
+        """
+        return self.get_item(kid, u'RSA', use)[1]
+
+    def get_signature_item(self, kid = None, alg = None):
+        """Return the ``(key, rsa_public_key)`` couple of the key matching given criteria that may be used to verify
+        signatures, or ``(None, None)``.
+
+        Keys whose ``use`` is ``sig`` are looked up first, then keys without ``use``. Keys used for encryption are
+        never returned.
+        """
+        item = self.get_item(kid, alg, u'sig')
+        return item if item[0] is not None else self.get_item(kid, alg, False)
+
+    def load(self, json_web_key_set, state = None):
+        """Validate a JSON Web Key Set and replace the indexed keys with its keys.
+
+        Raise a ``ValueError`` when *json_web_key_set* is not valid.
+        """
+        keys = check(json_to_json_web_key_set)(json_web_key_set, state = state)['jwk']
+        index = {}
+        for key in keys:
+            if key['alg'] == u'RSA':
+                rsa_public_key = RSA.construct((
+                    number.bytes_to_long(check(base64url_to_bytes)(key['mod'])),
+                    number.bytes_to_long(check(base64url_to_bytes)(key['exp'])),
+                    ))
+            else:
+                rsa_public_key = None
+            # Register the key under every combination of its criteria and of wildcards, so that the last key wins.
+            # A key without use is also registered with a False use, to be able to look up keys without use.
+            for criteria in itertools.product(
+                    (None, key['kid']) if key.get('kid') is not None else (None,),
+                    (None, key['alg']) if key.get('alg') is not None else (None,),
+                    (None, key['use']) if key.get('use') is not None else (None, False),
+                    ):
+                index[criteria] = (key, rsa_public_key)
+        # Replace the index in a single assignment, so that concurrent lookups are never given a partial index.
+        self.index = index
+        self.keys = keys
+
+    def reload(self, state = None):
+        """Load the key set from its file when the file has been modified since the last load.
+
+        Return ``True`` when the key set has been (re)loaded. Raise an ``IOError`` or ``ValueError`` when the file is
+        missing or invalid and no key set has been loaded yet; otherwise the previous keys are kept.
+        """
+        assert self.file_path is not None
+        with self.lock:
+            if self.reload_interval is not None:
+                self.next_reload_check = self.clock() + self.reload_interval
+            try:
+                modification_time = os.stat(self.file_path).st_mtime
+                if modification_time == self.file_modification_time:
+                    return False
+                with open(self.file_path) as json_file:
+                    self.load(json.load(json_file), state = state)
+            except (IOError, OSError, ValueError):
+                if self.index is None:
+                    raise
+                return False
+            self.file_modification_time = modification_time
+            return True
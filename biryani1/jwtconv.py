@@ -28,39 +28,53 @@ cf http://tools.ietf.org/html/draft-jones-json-web-token
 """
 
 
-import calendar
-import datetime
+import base64
+import copy
+import hashlib
+import hmac
 from struct import pack
+import time
 import zlib
 
 from Crypto import Random
 from Crypto.Cipher import AES as Cipher_AES, PKCS1_v1_5 as Cipher_PKCS1_v1_5, PKCS1_OAEP as Cipher_PKCS1_OAEP
 from Crypto.Signature import PKCS1_v1_5 as Signature_PKCS1_v1_5
-from Crypto.Hash import HMAC, SHA256, SHA384, SHA512
+from Crypto.Hash import SHA256, SHA384, SHA512
 from Crypto.PublicKey import RSA
 from Crypto.Util import number
 
 from . import gcm, states
+from .caches import LRUCache
 from .base64conv import base64_to_bytes, make_base64url_to_bytes, make_bytes_to_base64url
-from .baseconv import (check, cleanup_line, get, make_input_to_url, N_, noop, not_none, pipe, struct, test,
-    test_greater_or_equal, test_in, test_isinstance, test_less_or_equal, uniform_sequence)
+from .baseconv import (check, cleanup_line, get, make_input_to_url, N_, noop, not_none, pipe, struct,
+    test_greater_or_equal, test_in, test_isinstance, uniform_sequence)
 from .jsonconv import make_json_to_str, make_input_to_json
-from .jwkconv import json_to_json_web_key
+from .jwkconv import json_to_json_web_key, JsonWebKeySet
+from .strings import constant_time_compare
 
 
 __all__ = [
+    'cache_verified_json_web_token',
     'decode_json_web_token',
     'decode_json_web_token_claims',
     'decoded_json_web_token_to_json',
     'decrypt_json_web_token',
+    'decrypt_json_web_token_stream',
+    'derive_content_keys',
     'derive_key',
+    'encoded_encrypted_header_to_json',
+    'encoded_header_to_json',
     'encrypt_json_web_token',
+    'encrypt_json_web_token_stream',
     'input_to_json_web_token',
     'make_json_to_json_web_token',
     'make_payload_to_json_web_token',
+    'payload_to_json_web_token_claims',
     'sign_json_web_token',
     'verify_decoded_json_web_token_signature',
     'verify_decoded_json_web_token_time',
+    'verify_many',
+    'verify_rsa_json_web_token_signatures',
     ]
 
 digest_constructor_by_size = {
@@ -68,6 +82,11 @@ digest_constructor_by_size = {
     384: SHA384,
     512: SHA512,
     }
+hashlib_constructor_by_size = {
+    256: hashlib.sha256,
+    384: hashlib.sha384,
+    512: hashlib.sha512,
+    }
 valid_encryption_algorithms = (
     u'A128KW',
     u'A256KW',
@@ -101,6 +120,492 @@ valid_signature_algorithms = (
     u'RS512',
     )
 
+bytes_to_unpadded_base64url = make_bytes_to_base64url(remove_padding = True)
+content_keys_by_master_key_digest = LRUCache(max_size = 256)
+content_master_key_by_encrypted_key = LRUCache(max_size = 256)
+json_to_encoded_header = pipe(
+    make_json_to_str(encoding = 'utf-8', ensure_ascii = False, separators = (',', ':'), sort_keys = True),
+    bytes_to_unpadded_base64url,
+    )
+unpadded_base64url_to_bytes = make_base64url_to_bytes(add_padding = True)
+
+
+# Utility functions
+
+
+def compute_hmac(hmac_prototype, message):
+    """Return the HMAC digest of *message*, computed with a copy of a keyed HMAC object.
+
+    >>> from Crypto.Hash import HMAC
+    >>> compute_hmac(make_hmac_prototype('secret', 256), 'message') == HMAC.new('secret', msg = 'message',
+    ...     digestmod = SHA256).digest()
+    True
+    """
+    hmac_object = hmac_prototype.copy()
+    hmac_object.update(message)
+    return hmac_object.digest()
+
+
+def get_signature_error(verified, state):
+    """Return the error message of a signature verification result: ``True``, ``False``, or ``None`` when the
+    signature is invalid."""
+    if verified is None:
+        return state._(u'Invalid signature')
+    if not verified:
+        return state._(u'Non authentic signature')
+    return None
+
+
+def iter_base64url_decoded(chunks):
+    """Decode chunks of unpadded URL-safe base64 data. Raise a ``ValueError`` when data is invalid."""
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        length = len(buffer) & ~3
+        if length:
+            try:
+                yield base64.urlsafe_b64decode(buffer[:length])
+            except TypeError:
+                raise ValueError('Invalid base64url string')
+            buffer = buffer[length:]
+    if buffer:
+        if len(buffer) == 1:
+            raise ValueError('Invalid base64url string')
+        try:
+            yield base64.urlsafe_b64decode(buffer + '=' * (4 - len(buffer)))
+        except TypeError:
+            raise ValueError('Invalid base64url string')
+
+
+def iter_base64url_encoded(chunks):
+    """Encode chunks of bytes to unpadded URL-safe base64.
+
+    >>> ''.join(iter_base64url_encoded(['Hel', 'lo W', 'orld'])) == check(bytes_to_unpadded_base64url)('Hello World')
+    True
+    >>> ''.join(iter_base64url_decoded(iter_base64url_encoded(['Hel', 'lo W', 'orld'])))
+    'Hello World'
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        length = len(buffer) - len(buffer) % 3
+        if length:
+            yield base64.urlsafe_b64encode(buffer[:length])
+            buffer = buffer[length:]
+    if buffer:
+        yield base64.urlsafe_b64encode(buffer).rstrip('=')
+
+
+def iter_cbc_decrypted(cipher, chunks):
+    """Decrypt chunks of data using a CBC *cipher*, and remove the PKCS #5 padding of the last block. Raise a
+    ``ValueError`` when data is invalid."""
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        # Keep the last block, to remove its padding.
+        length = max(len(buffer) - 16, 0) & ~15
+        if length:
+            yield cipher.decrypt(buffer[:length])
+            buffer = buffer[length:]
+    if not buffer or len(buffer) % 16 != 0:
+        raise ValueError('Invalid cyphertext length')
+    plaintext = cipher.decrypt(buffer)
+    padding_number = ord(plaintext[-1])
+    if not 1 <= padding_number <= 16:
+        raise ValueError('Invalid padding')
+    yield plaintext[:-padding_number]
+
+
+def iter_cbc_encrypted(cipher, chunks):
+    """Encrypt chunks of data using a CBC *cipher*, adding a PKCS #5 padding to the last block."""
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        length = len(buffer) & ~15
+        if length:
+            yield cipher.encrypt(buffer[:length])
+            buffer = buffer[length:]
+    padding_number = 16 - len(buffer) % 16
+    yield cipher.encrypt(buffer + chr(padding_number) * padding_number)
+
+
+def iter_chunks(source, chunk_size):
+    """Iterate over the non empty chunks of bytes of *source*, either a file-like object (read by chunks of
+    *chunk_size* bytes) or an iterable of bytes strings."""
+    read = getattr(source, 'read', None)
+    if read is None:
+        for chunk in source:
+            if chunk:
+                yield chunk
+    else:
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_deflated(chunks):
+    """Compress chunks of bytes (using zlib)."""
+    compressor = zlib.compressobj(9)
+    for chunk in chunks:
+        compressed_chunk = compressor.compress(chunk)
+        if compressed_chunk:
+            yield compressed_chunk
+    yield compressor.flush()
+
+
+def iter_inflated(chunks):
+    """Decompress chunks of bytes (using zlib). Raise a ``zlib.error`` when data is invalid."""
+    decompressor = zlib.decompressobj()
+    for chunk in chunks:
+        decompressed_chunk = decompressor.decompress(chunk)
+        if decompressed_chunk:
+            yield decompressed_chunk
+    yield decompressor.flush()
+
+
+def json_web_key_to_rsa_public_key(public_key_dict):
+    """Return the RSA public key object of a JSON Web Key public key dictionary.
+
+    >>> from Crypto.PublicKey import RSA
+    >>> from Crypto.Util import number
+    >>> rsa_key = RSA.generate(1024)
+    >>> public_key_dict = dict(
+    ...     alg = u'RSA',
+    ...     exp = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.e)),
+    ...     mod = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.n)),
+    ...     )
+    >>> rsa_public_key = json_web_key_to_rsa_public_key(public_key_dict)
+    >>> rsa_public_key == rsa_key.publickey()
+    True
+    """
+    return RSA.construct((
+        number.bytes_to_long(check(unpadded_base64url_to_bytes)(public_key_dict['mod'])),
+        number.bytes_to_long(check(unpadded_base64url_to_bytes)(public_key_dict['exp'])),
+        ))
+
+
+def make_cached_header_converter(converter, max_size = 256):
+    """Return a converter that decodes an encoded header using given *converter* and keeps the decoded headers in a
+    bounded cache.
+
+    Signed tokens usually share a handful of distinct headers, so decoding (and validating) a header is most of the
+    time a dictionary lookup. Only valid headers are cached.
+
+    .. note:: Each call returns a new copy of the header, that the caller is free to modify. The copy is shallow when
+       the header contains no list or dict, and deep otherwise.
+
+    .. warning:: Don't use this cache for the headers of encrypted tokens: They contain a random ``iv`` and never
+       repeat.
+
+    >>> header_to_json = make_cached_header_converter(pipe(unpadded_base64url_to_bytes, make_input_to_json()))
+    >>> header, error = header_to_json(u'eyJhbGciOiJub25lIiwiY3JpdCI6WyJleHAiXX0')
+    >>> header['crit'].append(u'iat')
+    >>> header_to_json(u'eyJhbGciOiJub25lIiwiY3JpdCI6WyJleHAiXX0')[0]['crit']
+    [u'exp']
+    """
+    cache = LRUCache(max_size = max_size)
+
+    def cached_header_converter(value, state = None):
+        if value is None:
+            return value, None
+        entry = cache.get(value)
+        if entry is None:
+            if state is None:
+                state = states.default_state
+            header, error = converter(value, state = state)
+            if error is not None or not isinstance(header, dict):
+                return header, error
+            is_flat = not any(isinstance(item, (dict, list)) for item in header.itervalues())
+            entry = cache[value] = (header, is_flat)
+        header, is_flat = entry
+        return dict(header) if is_flat else copy.deepcopy(header), None
+    cached_header_converter.cache = cache
+    return cached_header_converter
+
+
+def make_hmac_prototype(key, digest_size):
+    """Return a keyed HMAC object, meant to be copied for each message to authenticate.
+
+    The inner & outer padded keys are hashed once, when the prototype is made, instead of once per message. Converters
+    make the prototypes of their configured keys when they are built: Keys are never cached globally.
+    """
+    return hmac.new(key, digestmod = hashlib_constructor_by_size[digest_size])
+
+
+def make_rsa_signature_verifier(public_key_as_encoded_str = None, public_key_as_json_web_key = None):
+    """Return a PKCS#1 v1.5 signature verifier for an RSA public key, given either encoded or as a JSON Web Key, or
+    ``None`` when no key is given.
+
+    When *public_key_as_json_web_key* is a :class:`biryani1.jwkconv.JsonWebKeySet`, the key depends on each token, so
+    ``None`` is also returned.
+    """
+    if public_key_as_encoded_str is not None:
+        return Signature_PKCS1_v1_5.new(RSA.importKey(public_key_as_encoded_str))
+    if public_key_as_json_web_key is not None and not isinstance(public_key_as_json_web_key, JsonWebKeySet):
+        public_key_dict = public_key_as_json_web_key['jwk'][-1]  # TODO
+        assert public_key_dict['alg'] == u'RSA', public_key_as_json_web_key  # TODO
+        return Signature_PKCS1_v1_5.new(json_web_key_to_rsa_public_key(public_key_dict))
+    return None
+
+
+def verify_rsa_signature(verifier, digest_size, secured_input, signature):
+    """Verify a PKCS#1 v1.5 signature and return ``True``, ``False``, or ``None`` when the signature is invalid."""
+    try:
+        return verifier.verify(digest_constructor_by_size[digest_size].new(secured_input), signature)
+    except:
+        return None
+
+
+# Header Converters
+
+
+encoded_encrypted_header_to_json = pipe(
+    unpadded_base64url_to_bytes,
+    make_input_to_json(),
+    test_isinstance(dict),
+    struct(
+        dict(
+            alg = pipe(
+                test_isinstance(basestring),
+                test_in(valid_encryption_algorithms),
+                not_none,
+                ),
+            cty = pipe(
+                test_isinstance(basestring),
+                test_in([
+                    u'JWT',
+                    # u'urn:ietf:params:oauth:token-type:jwt',
+                    ]),
+                ),
+            enc = pipe(
+                test_isinstance(basestring),
+                test_in(valid_encryption_methods),
+                not_none,
+                ),
+            # epk = TODO to support ECDH-ES
+            int = pipe(
+                test_isinstance(basestring),
+                test_in(valid_integrity_algorithms),
+                ),
+            iv = pipe(
+                test_isinstance(basestring),
+                unpadded_base64url_to_bytes,
+                ),
+            jku = pipe(
+                test_isinstance(basestring),
+                make_input_to_url(add_prefix = None, error_if_fragment = True, full = True,
+                    schemes = ['https']),
+                ),
+            jwk = pipe(
+                test_isinstance(basestring),
+                make_input_to_json(),
+                json_to_json_web_key,
+                ),
+            kdf = pipe(
+                test_isinstance(basestring),
+                test_in(valid_key_derivation_functions),
+                ),
+            kid = test_isinstance(basestring),
+            typ = pipe(
+                test_isinstance(basestring),
+                test_in([
+                    u'JWE',
+                    ]),
+                ),
+            x5c = pipe(
+                test_isinstance(list),
+                uniform_sequence(pipe(
+                    test_isinstance(basestring),
+                    base64_to_bytes,
+                    # TODO
+                    )),
+                ),
+            x5t = pipe(
+                test_isinstance(basestring),
+                unpadded_base64url_to_bytes,
+                # TODO
+                ),
+            x5u = pipe(
+                test_isinstance(basestring),
+                make_input_to_url(add_prefix = None, error_if_fragment = True, full = True,
+                    schemes = ['https']),
+                ),
+            zip = pipe(
+                test_isinstance(basestring),
+                test_in([
+                    u'DEF',
+                    u'none',
+                    ]),
+                ),
+            ),
+        # default = None,  # For security reasons a header can only contain known attributes.
+        ),
+    not_none,
+    )
+"""Decode and validate the (base64url encoded) header of an encrypted JSON Web Token.
+
+    >>> header, error = encoded_encrypted_header_to_json(u'eyJhbGciOiJSU0ExXzUiLCJlbmMiOiJBMTI4Q0JDIiwiaW50Ijoi\
+SFMyNTYiLCJpdiI6IkF4WThEQ3REYUdsc2JHbGpiM1JvWlEifQ')
+    >>> header['alg'], header['enc'], header['int'], header['iv'], header['zip'], error
+    (u'RSA1_5', u'A128CBC', u'HS256', '\\x03\\x16<\\x0c+Chillicothe', None, None)
+    >>> header, error = encoded_encrypted_header_to_json(u'eyJhbGciOiJub25lIn0')
+    >>> sorted(error.iteritems())
+    [('alg', u"Value must belong to (u'A128KW', u'A256KW', u'RSA1_5', u'RSA-OAEP')"), ('enc', u'Missing value')]
+    """
+
+encoded_header_to_json = make_cached_header_converter(pipe(
+    unpadded_base64url_to_bytes,
+    make_input_to_json(),
+    ))
+"""Decode the (base64url encoded) header of a JSON Web Token.
+
+    >>> encoded_header_to_json(u'eyJhbGciOiJub25lIn0')
+    ({u'alg': u'none'}, None)
+    >>> encoded_header_to_json(u'eyJhbGciOiJub25lIn0') # Second call uses cache.
+    ({u'alg': u'none'}, None)
+    >>> encoded_header_to_json(u'eyJhbGciOiJub25lI')
+    (u'eyJhbGciOiJub25lI', u'Invalid base64url string')
+    """
+
+
+# Claims Converters
+
+
+payload_to_json_web_token_claims = pipe(
+    make_input_to_json(),
+    test_isinstance(dict),
+    struct(
+        dict(
+            aud = pipe(
+                test_isinstance(basestring),
+                cleanup_line,
+                ),
+            exp = pipe(
+                test_isinstance((int, long)),
+                test_greater_or_equal(0),
+                ),
+            iat = pipe(
+                test_isinstance((int, long)),
+                test_greater_or_equal(0),
+                ),
+            iss = pipe(
+                test_isinstance(basestring),
+                cleanup_line,
+                ),
+            jti = pipe(
+                test_isinstance(basestring),
+                cleanup_line,
+                ),
+            nbf = pipe(
+                test_isinstance((int, long)),
+                test_greater_or_equal(0),
+                ),
+            prn = pipe(
+                test_isinstance(basestring),
+                cleanup_line,
+                ),
+            typ = pipe(
+                test_isinstance(basestring),
+                cleanup_line,
+                ),
+            ),
+        default = noop,
+        ),
+    )
+"""Convert the (JSON) payload of a JSON Web Token to validated claims.
+
+    >>> claims, error = payload_to_json_web_token_claims('{"exp":1300819380,"iss":" joe "}')
+    >>> claims['exp'], claims['iss'], claims['aud'], error
+    (1300819380, u'joe', None, None)
+    >>> payload_to_json_web_token_claims('{"exp":-1}')[1]
+    {'exp': u'Value must be greater than or equal to 0'}
+    """
+
+
+def cache_verified_json_web_token(converter, clock = None, default_ttl = 3600, drift = 300, max_age = None,
+        max_size = 1024):
+    """Return a converter that calls a JSON Web Token verification *converter* only for tokens that it has not already
+    verified.
+
+    *converter* must convert a token to a decoded token, for example by piping :func:`decode_json_web_token`,
+    :func:`decode_json_web_token_claims` & :func:`verify_decoded_json_web_token_signature`. The tokens it successfully
+    verifies are kept in a bounded LRU cache, keyed by a digest of the token. A cached token is dropped when its ``exp``
+    claim is more than *drift* seconds in the past (like :func:`verify_decoded_json_web_token_time` does) or, when
+    *max_age* is given, *max_age* seconds after its verification. A token without ``exp`` claim is kept *default_ttl*
+    seconds, when no *max_age* is given. A cached token whose ``nbf`` claim is more than *drift* seconds in the future
+    is verified again.
+
+    .. note:: Each call returns a new deep copy of the decoded token, that the caller is free to modify.
+
+    *clock* is a function returning the current timestamp (``time.time`` by default).
+
+    >>> now = [1300819380]
+    >>> verifications = []
+    >>> def verify(token, state = None):
+    ...     verifications.append(token)
+    ...     return pipe(
+    ...         decode_json_web_token,
+    ...         decode_json_web_token_claims,
+    ...         verify_decoded_json_web_token_signature(shared_secret = 'secret'),
+    ...         )(token, state = state)
+    >>> cached_verify = cache_verified_json_web_token(verify, clock = lambda: now[0])
+    >>> token = check(pipe(
+    ...     make_json_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = u'HS256', shared_secret = 'secret'),
+    ...     ))(dict(exp = 1300819380 + 60, iss = u'joe'))
+    >>> decoded_token, error = cached_verify(token)
+    >>> decoded_token['claims']['iss'], error, len(verifications)
+    (u'joe', None, 1)
+    >>> decoded_token, error = cached_verify(token)
+    >>> decoded_token['claims']['iss'], error, len(verifications)
+    (u'joe', None, 1)
+    >>> decoded_token['claims']['iss'] = u'jane'
+    >>> cached_verify(token)[0]['claims']['iss'], len(verifications)
+    (u'joe', 1)
+    >>> now[0] += 60 + 300
+    >>> decoded_token, error = cached_verify(token)
+    >>> len(verifications)
+    2
+    >>> decoded_token, error = cached_verify(token[:-1])
+    >>> error, len(verifications)
+    ({'signature': u'Non authentic signature'}, 3)
+    >>> cached_verify(None)
+    (None, None)
+    """
+    if clock is None:
+        clock = time.time
+    cache = LRUCache(clock = clock, max_size = max_size)
+
+    def cached_verified_json_web_token_converter(token, state = None):
+        if token is None:
+            return None, None
+        if state is None:
+            state = states.default_state
+        key = hashlib.sha256(token.encode('utf-8') if isinstance(token, unicode) else token).digest()
+        entry = cache.get(key)
+        if entry is not None:
+            decoded_token, not_before = entry
+            if not_before is None or clock() + drift >= not_before:
+                return copy.deepcopy(decoded_token), None
+        decoded_token, error = converter(token, state = state)
+        if error is not None or not isinstance(decoded_token, dict):
+            return decoded_token, error
+        claims = decoded_token.get('claims') or {}
+        expiration = claims.get('exp')
+        if expiration is not None:
+            expiration += drift
+        if max_age is not None:
+            max_age_expiration = clock() + max_age
+            expiration = max_age_expiration if expiration is None else min(expiration, max_age_expiration)
+        elif expiration is None and default_ttl is not None:
+            expiration = clock() + default_ttl
+        cache.set(key, (decoded_token, claims.get('nbf')), expiration = expiration)
+        return copy.deepcopy(decoded_token), None
+    cached_verified_json_web_token_converter.cache = cache
+    return cached_verified_json_web_token_converter
+
 
 def decode_json_web_token(token, state = None):
     """Decode a JSON Web Token, without converting payload to JSON claims, nor verifying its content."""
@@ -118,16 +623,13 @@ def decode_json_web_token(token, state = None):
         return decoded_token, dict(token = state._(u'Invalid format'))
 
     errors = {}
-    header, error = pipe(
-        make_base64url_to_bytes(add_padding = True),
-        make_input_to_json(),
-        )(decoded_token['encoded_header'], state = state)
+    header, error = encoded_header_to_json(decoded_token['encoded_header'], state = state)
     if error is None:
         decoded_token['header'] = header
     else:
         errors['encoded_header'] = state._(u'Invalid format')
     payload, error = pipe(
-        make_base64url_to_bytes(add_padding = True),
+        unpadded_base64url_to_bytes,
         not_none,
         )(decoded_token['encoded_payload'], state = state)
     if error is None:
@@ -135,7 +637,7 @@ def decode_json_web_token(token, state = None):
     else:
         payload = None
         errors['encoded_payload'] = state._(u'Invalid format')
-    signature, error = make_base64url_to_bytes(add_padding = True)(decoded_token['encoded_signature'], state = state)
+    signature, error = unpadded_base64url_to_bytes(decoded_token['encoded_signature'], state = state)
     if error is None:
         decoded_token['signature'] = signature
     else:
@@ -151,47 +653,7 @@ def decode_json_web_token_claims(decoded_token, state = None):
     if state is None:
         state = states.default_state
 
-    claims, errors = pipe(
-        make_input_to_json(),
-        test_isinstance(dict),
-        struct(
-            dict(
-                aud = pipe(
-                    test_isinstance(basestring),
-                    cleanup_line,
-                    ),
-                exp = pipe(
-                    test_isinstance((int, long)),
-                    test_greater_or_equal(0),
-                    ),
-                iat = pipe(
-                    test_isinstance((int, long)),
-                    test_greater_or_equal(0),
-                    ),
-                iss = pipe(
-                    test_isinstance(basestring),
-                    cleanup_line,
-                    ),
-                jti = pipe(
-                    test_isinstance(basestring),
-                    cleanup_line,
-                    ),
-                nbf = pipe(
-                    test_isinstance((int, long)),
-                    test_greater_or_equal(0),
-                    ),
-                prn = pipe(
-                    test_isinstance(basestring),
-                    cleanup_line,
-                    ),
-                typ = pipe(
-                    test_isinstance(basestring),
-                    cleanup_line,
-                    ),
-                ),
-            default = noop,
-            ),
-        )(decoded_token.get('payload'), state = state)
+    claims, errors = payload_to_json_web_token_claims(decoded_token.get('payload'), state = state)
     if errors is not None:
         return decoded_token, dict(claims = errors)
     decoded_token['claims'] = claims
@@ -502,6 +964,7 @@ _3cYrFHM7X640lLd_QoUKw'
     """
     if shared_secret is not None:
         assert isinstance(shared_secret, str)  # Shared secret must not be unicode.
+    rsa_private_key = RSA.importKey(private_key) if private_key is not None else None
 
     def decrypt_json_web_token_converter(token, state = None):
         if token is None:
@@ -515,148 +978,29 @@ _3cYrFHM7X640lLd_QoUKw'
             return token, None
         encoded_header, encoded_encrypted_key, encoded_cyphertext, encoded_integrity_value = token.split('.')
 
-        header, error = pipe(
-            make_base64url_to_bytes(add_padding = True),
-            make_input_to_json(),
-            test_isinstance(dict),
-            struct(
-                dict(
-                    alg = pipe(
-                        test_isinstance(basestring),
-                        test_in(valid_encryption_algorithms),
-                        not_none,
-                        ),
-                    cty = pipe(
-                        test_isinstance(basestring),
-                        test_in([
-                            u'JWT',
-                            # u'urn:ietf:params:oauth:token-type:jwt',
-                            ]),
-                        ),
-                    enc = pipe(
-                        test_isinstance(basestring),
-                        test_in(valid_encryption_methods),
-                        not_none,
-                        ),
-                    # epk = TODO to support ECDH-ES
-                    int = pipe(
-                        test_isinstance(basestring),
-                        test_in(valid_integrity_algorithms),
-                        ),
-                    iv = pipe(
-                        test_isinstance(basestring),
-                        make_base64url_to_bytes(add_padding = True),
-                        ),
-                    jku = pipe(
-                        test_isinstance(basestring),
-                        make_input_to_url(add_prefix = None, error_if_fragment = True, full = True,
-                            schemes = ['https']),
-                        ),
-                    jwk = pipe(
-                        test_isinstance(basestring),
-                        make_input_to_json(),
-                        json_to_json_web_key,
-                        ),
-                    kdf = pipe(
-                        test_isinstance(basestring),
-                        test_in(valid_key_derivation_functions),
-                        ),
-                    kid = test_isinstance(basestring),
-                    typ = pipe(
-                        test_isinstance(basestring),
-                        test_in([
-                            u'JWE',
-                            ]),
-                        ),
-                    x5c = pipe(
-                        test_isinstance(list),
-                        uniform_sequence(pipe(
-                            test_isinstance(basestring),
-                            base64_to_bytes,
-                            # TODO
-                            )),
-                        ),
-                    x5t = pipe(
-                        test_isinstance(basestring),
-                        make_base64url_to_bytes(add_padding = True),
-                        # TODO
-                        ),
-                    x5u = pipe(
-                        test_isinstance(basestring),
-                        make_input_to_url(add_prefix = None, error_if_fragment = True, full = True,
-                            schemes = ['https']),
-                        ),
-                    zip = pipe(
-                        test_isinstance(basestring),
-                        test_in([
-                            u'DEF',
-                            u'none',
-                            ]),
-                        ),
-                    ),
-                # default = None,  # For security reasons a header can only contain known attributes.
-                ),
-            not_none,
-            )(encoded_header, state = state)
+        header, error = encoded_encrypted_header_to_json(encoded_header, state = state)
         if error is not None:
             return token, state._(u'Invalid header: {0}').format(error)
-        encrypted_key, error = make_base64url_to_bytes(add_padding = True)(encoded_encrypted_key, state = state)
+        encrypted_key, error = unpadded_base64url_to_bytes(encoded_encrypted_key, state = state)
         if error is not None:
             return token, state._(u'Invalid encrypted key: {0}').format(error)
-        cyphertext, error = make_base64url_to_bytes(add_padding = True)(encoded_cyphertext, state = state)
+        cyphertext, error = unpadded_base64url_to_bytes(encoded_cyphertext, state = state)
         if error is not None:
             return token, state._(u'Invalid cyphertext: {0}').format(error)
-        integrity_value, error = make_base64url_to_bytes(add_padding = True)(encoded_integrity_value, state = state)
+        integrity_value, error = unpadded_base64url_to_bytes(encoded_integrity_value, state = state)
         if error is not None:
             return token, state._(u'Invalid integrity value: {0}').format(error)
 
-        # TODO: Verify that the JWE Header references a key known to the recipient.
-
-        algorithm = header['alg']
-        if algorithm == u'RSA1_5':
-            assert private_key is not None
-            rsa_private_key = RSA.importKey(private_key)
-            cipher = Cipher_PKCS1_v1_5.new(rsa_private_key)
-            # Build a sentinel that has the same size of the plaintext (ie the content master key).
-            sentinel = Random.get_random_bytes(256 >> 3)
-            try:
-                content_master_key = cipher.decrypt(encrypted_key, sentinel)
-            except:
-                return token, state._(u'Invalid content master key')
-        elif algorithm == u'RSA-OAEP':
-            assert private_key is not None
-            rsa_private_key = RSA.importKey(private_key)
-            cipher = Cipher_PKCS1_OAEP.new(rsa_private_key)
-            try:
-                content_master_key = cipher.decrypt(encrypted_key)
-            except:
-                return token, state._(u'Invalid content master key')
-
+        content_keys, error = decrypt_json_web_token_keys(header, encrypted_key, rsa_private_key, state = state)
+        if error is not None:
+            return token, error
+        content_encryption_key, content_integrity_key = content_keys
         method = header['enc']
-        if method.endswith('GCM'):
-            # Algorithm is an AEAD algorithm.
-            if header['int'] is not None:
-                return token, state._(
-                    u'Unexpected "int" header forbidden by AEAD algorithm {0}').format(algorithm)
-            content_encryption_key = content_master_key
-        else:
-            # Algorithm is not an AEAD algorithm.
-            if header['int'] is None:
-                return token, state._(
-                    u'Missing "int" header, required by non AEAD algorithm {0}').format(algorithm)
-            method_size = int(method[1:4])
-            key_derivation_digest_size = int((header['kdf'] or u'CS256')[2:])
-            content_encryption_key = derive_key(content_master_key, 'Encryption',
-                digest_size = key_derivation_digest_size, key_size = method_size)
-            integrity = header['int']
-            integrity_size = int(integrity[2:])
-            content_integrity_key = derive_key(content_master_key, 'Integrity',
-                digest_size = key_derivation_digest_size, key_size = integrity_size)
+        if content_integrity_key is not None:
             secured_input = token.rsplit('.', 1)[0]
-            digest_constructor = digest_constructor_by_size[integrity_size]
-            signature = HMAC.new(content_integrity_key, msg = secured_input, digestmod = digest_constructor).digest()
-            encoded_signature = check(make_bytes_to_base64url(remove_padding = True))(signature, state = state)
-            if encoded_integrity_value != encoded_signature:
+            signature = hmac.new(content_integrity_key, secured_input,
+                hashlib_constructor_by_size[int(header['int'][2:])]).digest()
+            if not constant_time_compare(signature, integrity_value):
                 return token, state._(u'Non authentic signature')
 
         if method.startswith(u'A') and method.endswith(u'CBC'):
@@ -703,15 +1047,224 @@ _3cYrFHM7X640lLd_QoUKw'
         header = dict(
             alg = u'none',
             )
-        encoded_header = check(pipe(
-            make_json_to_str(encoding = 'utf-8', ensure_ascii = False, separators = (',', ':'), sort_keys = True),
-            make_bytes_to_base64url(remove_padding = True),
-            ))(header)
-        encoded_payload = check(make_bytes_to_base64url(remove_padding = True))(plaintext, state = state)
+        encoded_header = check(json_to_encoded_header)(header, state = state)
+        encoded_payload = check(bytes_to_unpadded_base64url)(plaintext, state = state)
         return '{0}.{1}.'.format(encoded_header, encoded_payload), None
     return decrypt_json_web_token_converter
 
 
+def decrypt_json_web_token_keys(header, encrypted_key, rsa_private_key, state = None):
+    """Decrypt the content master key of an encrypted JSON Web Token and return its
+    ``(content_encryption_key, content_integrity_key)`` couple.
+
+    *header* is the decoded JWE header and *encrypted_key* the decoded encrypted content master key.
+    """
+    if state is None:
+        state = states.default_state
+
+    # TODO: Verify that the JWE Header references a key known to the recipient.
+
+    algorithm = header['alg']
+    if algorithm.startswith(u'RSA'):
+        assert rsa_private_key is not None
+        # Tokens of the same session share the same encrypted key: Unwrap it only once.
+        cache_key = (algorithm, rsa_private_key.n, encrypted_key)
+        content_master_key = content_master_key_by_encrypted_key.get(cache_key)
+    if algorithm == u'RSA1_5' and content_master_key is None:
+        cipher = Cipher_PKCS1_v1_5.new(rsa_private_key)
+        # Build a sentinel that has the same size of the plaintext (ie the content master key).
+        sentinel = Random.get_random_bytes(256 >> 3)
+        try:
+            content_master_key = cipher.decrypt(encrypted_key, sentinel)
+        except:
+            return None, state._(u'Invalid content master key')
+        # A failed unwrap returns the random sentinel, which must never be reused by another token.
+        if content_master_key is not sentinel:
+            content_master_key_by_encrypted_key[cache_key] = content_master_key
+    elif algorithm == u'RSA-OAEP' and content_master_key is None:
+        cipher = Cipher_PKCS1_OAEP.new(rsa_private_key)
+        try:
+            content_master_key = cipher.decrypt(encrypted_key)
+        except:
+            return None, state._(u'Invalid content master key')
+        content_master_key_by_encrypted_key[cache_key] = content_master_key
+
+    method = header['enc']
+    if method.endswith('GCM'):
+        # Algorithm is an AEAD algorithm.
+        if header['int'] is not None:
+            return None, state._(u'Unexpected "int" header forbidden by AEAD algorithm {0}').format(algorithm)
+        return (content_master_key, None), None
+    # Algorithm is not an AEAD algorithm.
+    if header['int'] is None:
+        return None, state._(u'Missing "int" header, required by non AEAD algorithm {0}').format(algorithm)
+    return derive_content_keys(content_master_key, int(method[1:4]), int(header['int'][2:]),
+        digest_size = int((header['kdf'] or u'CS256')[2:])), None
+
+
+def decrypt_json_web_token_stream(token, output, chunk_size = 65536, private_key = None, state = None):
+    """Decrypt an encrypted JSON Web Token, read by chunks from *token*, and write its (decrypted and uncompressed)
+    payload to *output*.
+
+    *token* is either a file-like object or an iterable of bytes strings and *output* is a file-like object (with a
+    ``write`` method). Unlike :func:`decrypt_json_web_token`, the token is never held in memory as a whole, so this
+    function is meant for huge tokens. See :func:`encrypt_json_web_token_stream` for an example.
+
+    Return a ``(header, error)`` couple, where *header* is the JWE header of the token.
+
+    .. warning:: The payload is written to *output* while it is decrypted, that is before the integrity value of the
+       token is checked: When an error is returned, everything written to *output* must be discarded.
+    """
+    if state is None:
+        state = states.default_state
+    rsa_private_key = RSA.importKey(private_key) if private_key is not None else None
+    chunks = iter_chunks(token, chunk_size)
+
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if buffer.count('.') >= 2:
+            break
+    else:
+        return None, state._(u'Invalid crypted JSON web token')
+    encoded_header, encoded_encrypted_key, buffer = buffer.split('.', 2)
+
+    header, error = encoded_encrypted_header_to_json(encoded_header, state = state)
+    if error is not None:
+        return None, state._(u'Invalid header: {0}').format(error)
+    encrypted_key, error = unpadded_base64url_to_bytes(encoded_encrypted_key, state = state)
+    if error is not None:
+        return header, state._(u'Invalid encrypted key: {0}').format(error)
+    content_keys, error = decrypt_json_web_token_keys(header, encrypted_key, rsa_private_key, state = state)
+    if error is not None:
+        return header, error
+    content_encryption_key, content_integrity_key = content_keys
+    method = header['enc']
+    if header['iv'] is None:
+        return header, state._(u'Invalid header: "iv" required for {0} encryption method').format(method)
+
+    encoded_integrity_value_fragments = []
+    if content_integrity_key is None:
+        hmac_object = None
+    else:
+        hmac_object = make_hmac_prototype(content_integrity_key, int(header['int'][2:]))
+        hmac_object.update('{0}.{1}.'.format(encoded_header, encoded_encrypted_key))
+
+    def iter_encoded_cyphertext(buffer):
+        # Yield the encoded cyphertext, until the "." preceding the integrity value.
+        while '.' not in buffer:
+            if buffer:
+                if hmac_object is not None:
+                    hmac_object.update(buffer)
+                yield buffer
+            buffer = next(chunks, None)
+            if buffer is None:
+                return
+        buffer, encoded_integrity_value_fragment = buffer.split('.', 1)
+        if buffer:
+            if hmac_object is not None:
+                hmac_object.update(buffer)
+            yield buffer
+        encoded_integrity_value_fragments.append(encoded_integrity_value_fragment)
+        encoded_integrity_value_fragments.extend(chunks)
+
+    encoded_cyphertext_chunks = iter_encoded_cyphertext(buffer)
+    if method.startswith(u'A') and method.endswith(u'CBC'):
+        cipher = Cipher_AES.new(content_encryption_key, mode = Cipher_AES.MODE_CBC, IV = header['iv'])
+        compressed_plaintext_chunks = iter_cbc_decrypted(cipher, iter_base64url_decoded(encoded_cyphertext_chunks))
+    else:
+        # The header converter only accepts AES CBC & GCM methods.
+        assert method.startswith(u'A') and method.endswith(u'GCM'), method
+        cipher = gcm.new_gcm_cipher(content_encryption_key, header['iv'],
+            '{0}.{1}'.format(encoded_header, encoded_encrypted_key))
+        compressed_plaintext_chunks = (
+            cipher.decrypt(cyphertext_chunk)
+            for cyphertext_chunk in iter_base64url_decoded(encoded_cyphertext_chunks)
+            )
+    compression = header['zip']
+    if compression == u'DEF':
+        plaintext_chunks = iter_inflated(compressed_plaintext_chunks)
+    else:
+        assert compression in (None, u'none'), compression
+        plaintext_chunks = compressed_plaintext_chunks
+
+    decoding_error = None
+    try:
+        for plaintext_chunk in plaintext_chunks:
+            output.write(plaintext_chunk)
+    except ValueError:
+        decoding_error = state._(u'Invalid cyphertext')
+    except zlib.error:
+        decoding_error = state._(u'Invalid compressed plaintext')
+    # Read (and decrypt) the rest of the token, to check its integrity, even when its plaintext can't be decoded.
+    try:
+        for compressed_plaintext_chunk in compressed_plaintext_chunks:
+            pass
+    except ValueError:
+        pass
+    for encoded_cyphertext_chunk in encoded_cyphertext_chunks:
+        pass
+
+    if not encoded_integrity_value_fragments:
+        return header, state._(u'Invalid crypted JSON web token')
+    integrity_value, error = unpadded_base64url_to_bytes(''.join(encoded_integrity_value_fragments), state = state)
+    if error is not None:
+        return header, state._(u'Invalid integrity value: {0}').format(error)
+    if hmac_object is not None:
+        if not constant_time_compare(hmac_object.digest(), integrity_value):
+            return header, state._(u'Non authentic signature')
+    else:
+        try:
+            cipher.verify(integrity_value)
+        except ValueError:
+            return header, state._(u'Invalid cyphertext')
+    return header, decoding_error
+
+
+def derive_content_keys(content_master_key, encryption_key_size, integrity_key_size, digest_size = None):
+    """Derive the content encryption key and the content integrity key from a content master key, and return them as
+    a ``(content_encryption_key, content_integrity_key)`` couple.
+
+    The result is the same as two calls to :func:`derive_key` (with ``'Encryption'`` & ``'Integrity'`` labels), but
+    the hash of the common prefix of each block is computed once for both keys. Derived keys are kept in a bounded
+    cache, keyed by a digest of the content master key.
+
+    >>> cmk = ''.join(chr(byte) for byte in range(32))
+    >>> derive_content_keys(cmk, 128, 256) == (derive_key(cmk, 'Encryption', key_size = 128),
+    ...     derive_key(cmk, 'Integrity', key_size = 256))
+    True
+    >>> derive_content_keys(cmk, 256, 512, digest_size = 384) == (
+    ...     derive_key(cmk, 'Encryption', digest_size = 384, key_size = 256),
+    ...     derive_key(cmk, 'Integrity', digest_size = 384, key_size = 512))
+    True
+    >>> derive_content_keys(cmk, 128, 256) is derive_content_keys(cmk, 128, 256)
+    True
+    """
+    assert isinstance(content_master_key, str)
+    if digest_size is None:
+        digest_size = 256
+    cache_key = (hashlib.sha256(content_master_key).digest(), digest_size, encryption_key_size, integrity_key_size)
+    content_keys = content_keys_by_master_key_digest.get(cache_key)
+    if content_keys is None:
+        digest_constructor = digest_constructor_by_size[digest_size]
+        digest_length = digest_size >> 3
+        keys_length = (encryption_key_size >> 3, integrity_key_size >> 3)
+        hashes_by_label = ([], [])
+        for index in range((max(keys_length) + digest_length - 1) // digest_length):
+            prefix_hash_object = digest_constructor.new(pack('>I', index + 1))
+            prefix_hash_object.update(content_master_key)
+            for label, key_length, hashes in zip(('Encryption', 'Integrity'), keys_length, hashes_by_label):
+                if index * digest_length < key_length:
+                    hash_object = prefix_hash_object.copy()
+                    hash_object.update(label)
+                    hashes.append(hash_object.digest())
+        content_keys = content_keys_by_master_key_digest[cache_key] = tuple(
+            ''.join(hashes)[:key_length]
+            for key_length, hashes in zip(keys_length, hashes_by_label)
+            )
+    return content_keys
+
+
 def derive_key(master_key, label, digest_size = None, key_size = None):
     """Concatenation Key Derivation Function
 
@@ -933,76 +1486,14 @@ BqAdzpROlyiw'
     assert method is None or method in valid_encryption_methods, method
 
     if algorithm is not None:
-        assert method is not None
-        method_size = int(method[1:4])
-        encryption_key_length = method_size >> 3  # method_size is in bits, but length is in bytes.
-        if method.endswith('GCM'):
-            # AEAD encryption doesn't use a separate integrity algorithm
-            integrity = None
-            integrity_key_length = 0
-        else:
-            assert integrity is not None, 'Encryption algorithm requires a separate integrity algorithm'
-            integrity_size = int(integrity[2:])
-            integrity_key_length = integrity_size >> 3
-
-        # The content master key must be at least as long as the encryption & integrity keys.
-        # TODO: Don't create a content master key, when key agreement is employed.
-        if content_master_key is None:
-            content_master_key = Random.get_random_bytes(max(encryption_key_length, integrity_key_length))
-        else:
-            assert len(content_master_key) >= max(encryption_key_length, integrity_key_length)
-        if encrypted_key is None:
-            # Note: ``encrypted_key`` should be ``None`` except for testing.
-            if algorithm.startswith(u'RSA'):
-                if public_key_as_encoded_str is None:
-                    assert public_key_as_json_web_key is not None
-                    public_key_dict = public_key_as_json_web_key['jwk'][-1]  # TODO
-                    assert public_key_dict['alg'] == u'RSA', public_key_as_json_web_key  # TODO
-                    rsa_public_key = RSA.construct((
-                        number.bytes_to_long(check(make_base64url_to_bytes(add_padding = True))(
-                            public_key_dict['mod'])),
-                        number.bytes_to_long(check(make_base64url_to_bytes(add_padding = True))(
-                            public_key_dict['exp'])),
-                        ))
-                else:
-                    rsa_public_key = RSA.importKey(public_key_as_encoded_str)
-                if algorithm == u'RSA1_5':
-                    cipher = Cipher_PKCS1_v1_5.new(rsa_public_key)
-                else:
-                    assert algorithm == u'RSA-OAEP', algorithm
-                    cipher = Cipher_PKCS1_OAEP.new(rsa_public_key)
-                encrypted_key = cipher.encrypt(content_master_key)
-            else:
-                TODO
-        encoded_encrypted_key = check(make_bytes_to_base64url(remove_padding = True))(encrypted_key)
-
-        # Generate a random Initialization Vector (IV) (if required for the algorithm).
-        if method in (u'A128CBC', u'A256CBC'):
-            # All AES CBC ciphers use 128 bits (= 16 bytes) blocks
-            if initialization_vector is None:
-                initialization_vector = Random.get_random_bytes(16)
-            else:
-                assert len(initialization_vector) == 16
-        elif method in (u'A128GCM', u'A256GCM'):
-            # All AES GCM ciphers use 96 bits (= 12 bytes) blocks
-            if initialization_vector is None:
-                initialization_vector = Random.get_random_bytes(12)
-            else:
-                assert len(initialization_vector) == 12
-        else:
-            initialization_vector = None
-
-        if method.endswith('GCM'):
-            # Algorithm is an AEAD algorithm.
-            content_encryption_key = content_master_key
-            content_integrity_key = None
-            assert key_derivation_function is None
-        else:
-            key_derivation_digest_size = int((key_derivation_function or u'CS256')[2:])
-            content_encryption_key = derive_key(content_master_key, 'Encryption',
-                digest_size = key_derivation_digest_size, key_size = method_size)
-            content_integrity_key = derive_key(content_master_key, 'Integrity',
-                digest_size = key_derivation_digest_size, key_size = integrity_size)
+        content_encryption_key, content_integrity_key, encoded_encrypted_key, initialization_vector, integrity = \
+            prepare_json_web_token_encryption(algorithm, content_master_key = content_master_key,
+                encrypted_key = encrypted_key, integrity = integrity, initialization_vector = initialization_vector,
+                key_derivation_function = key_derivation_function, method = method,
+                public_key_as_encoded_str = public_key_as_encoded_str,
+                public_key_as_json_web_key = public_key_as_json_web_key)
+        if integrity is not None:
+            integrity_hmac_prototype = make_hmac_prototype(content_integrity_key, int(integrity[2:]))
 
     def encrypt_json_web_token_converter(token, state = None):
         if token is None:
@@ -1015,10 +1506,7 @@ BqAdzpROlyiw'
         if '.' not in token:
             return token, state._(u'Missing header')
         encoded_header, token_without_header = token.split('.', 1)
-        header, error = pipe(
-            make_base64url_to_bytes(add_padding = True),
-            make_input_to_json(),
-            )(encoded_header, state = state)
+        header, error = encoded_header_to_json(encoded_header, state = state)
         if error is not None:
             return token, state._(u'Invalid header: {0}').format(error)
 
@@ -1028,7 +1516,7 @@ BqAdzpROlyiw'
             encoded_payload, encoded_integrity_value = token_without_header.split('.', 1)
             if encoded_integrity_value:
                 return token, state._(u'Unexpected signature in plaintext token')
-            plaintext, error = make_base64url_to_bytes(add_padding = True)(encoded_payload, state = state)
+            plaintext, error = unpadded_base64url_to_bytes(encoded_payload, state = state)
             if error is not None:
                 return token, state._(u'Invalid encoded payload: {0}').format(error)
         else:
@@ -1052,7 +1540,7 @@ BqAdzpROlyiw'
         # TODO ephemeral_public_key
         # header['epk'] = ephemeral_public_key
         if initialization_vector is not None:
-            header['iv'] = check(make_bytes_to_base64url(remove_padding = True))(initialization_vector, state = state)
+            header['iv'] = check(bytes_to_unpadded_base64url)(initialization_vector, state = state)
         # TODO header['jku']
         # TODO header['jwk']
         # TODO header['kid']
@@ -1061,10 +1549,7 @@ BqAdzpROlyiw'
         # TODO header['x5u']
         if compression not in (None, 'none'):
             header['zip'] = compression
-        encoded_header = check(pipe(
-            make_json_to_str(encoding = 'utf-8', ensure_ascii = False, separators = (',', ':'), sort_keys = True),
-            make_bytes_to_base64url(remove_padding = True),
-            ))(header, state = state)
+        encoded_header = check(json_to_encoded_header)(header, state = state)
 
         if method.startswith(u'A') and method.endswith(u'CBC'):
             # Add PKCS #5 padding.
@@ -1080,7 +1565,7 @@ BqAdzpROlyiw'
                 compressed_plaintext, additional_authenticated_data)
         else:
             TODO
-        encoded_cyphertext = check(make_bytes_to_base64url(remove_padding = True))(cyphertext, state = state)
+        encoded_cyphertext = check(bytes_to_unpadded_base64url)(cyphertext, state = state)
 
         secured_input = '{0}.{1}.{2}'.format(encoded_header, encoded_encrypted_key, encoded_cyphertext)
 
@@ -1088,16 +1573,123 @@ BqAdzpROlyiw'
             assert integrity_value is not None
         else:
             assert integrity_value is None
-            digest_constructor = digest_constructor_by_size[integrity_size]
-            integrity_value = HMAC.new(content_integrity_key, msg = secured_input,
-                digestmod = digest_constructor).digest()
-        encoded_integrity_value = check(make_bytes_to_base64url(remove_padding = True))(integrity_value, state = state)
+            integrity_value = compute_hmac(integrity_hmac_prototype, secured_input)
+        encoded_integrity_value = check(bytes_to_unpadded_base64url)(integrity_value, state = state)
 
         token = '{0}.{1}'.format(secured_input, encoded_integrity_value)
         return token, None
     return encrypt_json_web_token_converter
 
 
+def encrypt_json_web_token_stream(plaintext, output, algorithm = None, chunk_size = 65536, compression = None,
+        content_master_key = None, encrypted_key = None, integrity = None, initialization_vector = None,
+        key_derivation_function = None, method = None, public_key_as_encoded_str = None,
+        public_key_as_json_web_key = None, typ = None):
+    """Encrypt a payload, read by chunks from *plaintext*, into a JSON Web Token written to *output*.
+
+    *plaintext* is either a file-like object or an iterable of bytes strings and *output* is a file-like object (with
+    a ``write`` method). The generated token is the same as the one generated by :func:`encrypt_json_web_token` for
+    the plaintext token of the payload, but the payload is compressed, encrypted, authenticated & encoded by chunks,
+    without ever being held in memory as a whole.
+
+    >>> from cStringIO import StringIO
+    >>> from Crypto.PublicKey import RSA
+    >>> rsa_key = RSA.generate(1024)
+    >>> payload = ''.join(str(i) for i in range(20000))
+
+    >>> output = StringIO()
+    >>> encrypt_json_web_token_stream(StringIO(payload), output, algorithm = u'RSA-OAEP', chunk_size = 1000,
+    ...     compression = u'DEF', method = u'A256GCM', public_key_as_encoded_str = rsa_key.publickey().exportKey())
+    >>> jwe = output.getvalue()
+    >>> check(decrypt_json_web_token(private_key = rsa_key.exportKey()))(jwe) \\
+    ...     == check(make_payload_to_json_web_token())(payload)
+    True
+    >>> output = StringIO()
+    >>> header, error = decrypt_json_web_token_stream([jwe[i:i + 100] for i in range(0, len(jwe), 100)], output,
+    ...     private_key = rsa_key.exportKey())
+    >>> header['enc'], error, output.getvalue() == payload
+    (u'A256GCM', None, True)
+
+    >>> cmk = Random.get_random_bytes(32)
+    >>> encrypted_key = Cipher_PKCS1_OAEP.new(rsa_key.publickey()).encrypt(cmk)
+    >>> iv = Random.get_random_bytes(16)
+    >>> output = StringIO()
+    >>> encrypt_json_web_token_stream([payload[:333], payload[333:]], output, algorithm = u'RSA-OAEP',
+    ...     content_master_key = cmk, encrypted_key = encrypted_key, initialization_vector = iv,
+    ...     integrity = u'HS256', method = u'A128CBC')
+    >>> jwe = output.getvalue()
+    >>> jwe == check(pipe(
+    ...     make_payload_to_json_web_token(),
+    ...     encrypt_json_web_token(algorithm = u'RSA-OAEP', content_master_key = cmk, encrypted_key = encrypted_key,
+    ...         initialization_vector = iv, integrity = u'HS256', method = u'A128CBC'),
+    ...     ))(payload)
+    True
+    >>> output = StringIO()
+    >>> header, error = decrypt_json_web_token_stream(StringIO(jwe), output, chunk_size = 100,
+    ...     private_key = rsa_key.exportKey())
+    >>> error, output.getvalue() == payload
+    (None, True)
+    >>> tampered_jwe = jwe[:-100] + ('A' if jwe[-100] != 'A' else 'B') + jwe[-99:]
+    >>> decrypt_json_web_token_stream(StringIO(tampered_jwe), StringIO(), private_key = rsa_key.exportKey())[1]
+    u'Non authentic signature'
+    """
+    assert algorithm in valid_encryption_algorithms, algorithm
+    assert integrity is None or integrity in valid_integrity_algorithms, integrity
+    assert key_derivation_function is None or key_derivation_function in valid_key_derivation_functions, \
+        key_derivation_function
+    assert method in valid_encryption_methods, method
+    content_encryption_key, content_integrity_key, encoded_encrypted_key, initialization_vector, integrity = \
+        prepare_json_web_token_encryption(algorithm, content_master_key = content_master_key,
+            encrypted_key = encrypted_key, integrity = integrity, initialization_vector = initialization_vector,
+            key_derivation_function = key_derivation_function, method = method,
+            public_key_as_encoded_str = public_key_as_encoded_str,
+            public_key_as_json_web_key = public_key_as_json_web_key)
+
+    header = dict(
+        alg = algorithm,
+        enc = method,
+        )
+    if integrity is not None:
+        header['int'] = integrity
+    if initialization_vector is not None:
+        header['iv'] = check(bytes_to_unpadded_base64url)(initialization_vector)
+    if typ is not None:
+        header['typ'] = typ
+    if compression not in (None, 'none'):
+        header['zip'] = compression
+    encoded_header = check(json_to_encoded_header)(header)
+    additional_authenticated_data = '{0}.{1}'.format(encoded_header, encoded_encrypted_key)
+    output.write(additional_authenticated_data)
+    output.write('.')
+
+    chunks = iter_chunks(plaintext, chunk_size)
+    if compression == u'DEF':
+        chunks = iter_deflated(chunks)
+    else:
+        assert compression in (None, u'none'), compression
+    if method.startswith(u'A') and method.endswith(u'CBC'):
+        cipher = Cipher_AES.new(content_encryption_key, mode = Cipher_AES.MODE_CBC, IV = initialization_vector)
+        chunks = iter_cbc_encrypted(cipher, chunks)
+    else:
+        assert method.startswith(u'A') and method.endswith(u'GCM'), method
+        cipher = gcm.new_gcm_cipher(content_encryption_key, initialization_vector, additional_authenticated_data)
+        chunks = (cipher.encrypt(chunk) for chunk in chunks)
+    if integrity is None:
+        hmac_object = None
+    else:
+        hmac_object = make_hmac_prototype(content_integrity_key, int(integrity[2:]))
+        hmac_object.update(additional_authenticated_data)
+        hmac_object.update('.')
+    for encoded_cyphertext_chunk in iter_base64url_encoded(chunks):
+        if hmac_object is not None:
+            hmac_object.update(encoded_cyphertext_chunk)
+        output.write(encoded_cyphertext_chunk)
+
+    integrity_value = cipher.digest() if hmac_object is None else hmac_object.digest()
+    output.write('.')
+    output.write(check(bytes_to_unpadded_base64url)(integrity_value))
+
+
 input_to_json_web_token = cleanup_line
 
 
@@ -1116,10 +1708,7 @@ def make_payload_to_json_web_token(typ = None):
         )
     if typ is not None:
         header['typ'] = typ
-    encoded_header = check(pipe(
-        make_json_to_str(encoding = 'utf-8', ensure_ascii = False, separators = (',', ':'), sort_keys = True),
-        make_bytes_to_base64url(remove_padding = True),
-        ))(header)
+    encoded_header = check(json_to_encoded_header)(header)
 
     def payload_to_json_web_token(payload, state = None):
         if payload is None:
@@ -1127,7 +1716,7 @@ def make_payload_to_json_web_token(typ = None):
         if state is None:
             state = states.default_state
 
-        encoded_payload, error = make_bytes_to_base64url(remove_padding = True)(payload, state = state)
+        encoded_payload, error = bytes_to_unpadded_base64url(payload, state = state)
         if error is not None:
             return encoded_payload, error
         secured_input = '{0}.{1}'.format(encoded_header, encoded_payload)
@@ -1137,6 +1726,79 @@ def make_payload_to_json_web_token(typ = None):
     return payload_to_json_web_token
 
 
+def prepare_json_web_token_encryption(algorithm, content_master_key = None, encrypted_key = None, integrity = None,
+        initialization_vector = None, key_derivation_function = None, method = None, public_key_as_encoded_str = None,
+        public_key_as_json_web_key = None):
+    """Return the ``(content_encryption_key, content_integrity_key, encoded_encrypted_key, initialization_vector,
+    integrity)`` tuple needed to encrypt JSON Web Tokens.
+
+    A random content master key and a random initialization vector are generated, when they are not given.
+    """
+    assert method is not None
+    method_size = int(method[1:4])
+    encryption_key_length = method_size >> 3  # method_size is in bits, but length is in bytes.
+    if method.endswith('GCM'):
+        # AEAD encryption doesn't use a separate integrity algorithm
+        integrity = None
+        integrity_key_length = 0
+    else:
+        assert integrity is not None, 'Encryption algorithm requires a separate integrity algorithm'
+        integrity_size = int(integrity[2:])
+        integrity_key_length = integrity_size >> 3
+
+    # The content master key must be at least as long as the encryption & integrity keys.
+    # TODO: Don't create a content master key, when key agreement is employed.
+    if content_master_key is None:
+        content_master_key = Random.get_random_bytes(max(encryption_key_length, integrity_key_length))
+    else:
+        assert len(content_master_key) >= max(encryption_key_length, integrity_key_length)
+    if encrypted_key is None:
+        # Note: ``encrypted_key`` should be ``None`` except for testing.
+        if algorithm.startswith(u'RSA'):
+            if public_key_as_encoded_str is None:
+                assert public_key_as_json_web_key is not None
+                public_key_dict = public_key_as_json_web_key['jwk'][-1]  # TODO
+                assert public_key_dict['alg'] == u'RSA', public_key_as_json_web_key  # TODO
+                rsa_public_key = json_web_key_to_rsa_public_key(public_key_dict)
+            else:
+                rsa_public_key = RSA.importKey(public_key_as_encoded_str)
+            if algorithm == u'RSA1_5':
+                cipher = Cipher_PKCS1_v1_5.new(rsa_public_key)
+            else:
+                assert algorithm == u'RSA-OAEP', algorithm
+                cipher = Cipher_PKCS1_OAEP.new(rsa_public_key)
+            encrypted_key = cipher.encrypt(content_master_key)
+        else:
+            TODO
+    encoded_encrypted_key = check(bytes_to_unpadded_base64url)(encrypted_key)
+
+    # Generate a random Initialization Vector (IV) (if required for the algorithm).
+    if method in (u'A128CBC', u'A256CBC'):
+        # All AES CBC ciphers use 128 bits (= 16 bytes) blocks
+        if initialization_vector is None:
+            initialization_vector = Random.get_random_bytes(16)
+        else:
+            assert len(initialization_vector) == 16
+    elif method in (u'A128GCM', u'A256GCM'):
+        # All AES GCM ciphers use 96 bits (= 12 bytes) blocks
+        if initialization_vector is None:
+            initialization_vector = Random.get_random_bytes(12)
+        else:
+            assert len(initialization_vector) == 12
+    else:
+        initialization_vector = None
+
+    if method.endswith('GCM'):
+        # Algorithm is an AEAD algorithm.
+        content_encryption_key = content_master_key
+        content_integrity_key = None
+        assert key_derivation_function is None
+    else:
+        content_encryption_key, content_integrity_key = derive_content_keys(content_master_key, method_size,
+            integrity_size, digest_size = int((key_derivation_function or u'CS256')[2:]))
+    return content_encryption_key, content_integrity_key, encoded_encrypted_key, initialization_vector, integrity
+
+
 def sign_json_web_token(algorithm = None, json_web_key_url = None, key_id = None, private_key = None,
         shared_secret = None):
     if algorithm is None:
@@ -1152,11 +1814,11 @@ def sign_json_web_token(algorithm = None, json_web_key_url = None, key_id = None
         if algorithm_prefix == u'HS':
             assert shared_secret is not None
             assert isinstance(shared_secret, str)
+            hmac_prototype = make_hmac_prototype(shared_secret, algorithm_size)
         else:
             assert algorithm_prefix == u'RS'
             assert private_key is not None
-            rsa_private_key = RSA.importKey(private_key)
-            signer = Signature_PKCS1_v1_5.new(rsa_private_key)
+            signer = Signature_PKCS1_v1_5.new(RSA.importKey(private_key))
 
     def sign_json_web_token_converter(token, state = None):
         if token is None:
@@ -1168,10 +1830,7 @@ def sign_json_web_token(algorithm = None, json_web_key_url = None, key_id = None
         if '.' not in token:
             return token, state._(u'Missing header')
         encoded_header, token_without_header = token.split('.', 1)
-        header, error = pipe(
-            make_base64url_to_bytes(add_padding = True),
-            make_input_to_json(),
-            )(encoded_header, state = state)
+        header, error = encoded_header_to_json(encoded_header, state = state)
         if error is not None:
             return token, state._(u'Invalid header: {0}').format(error)
         if header['alg'] == u'none':
@@ -1186,28 +1845,25 @@ def sign_json_web_token(algorithm = None, json_web_key_url = None, key_id = None
                 cty = u'JWT',
                 typ = u'JWS',  # optional
                 )
-            encoded_payload = check(make_bytes_to_base64url(remove_padding = True))(token, state = state)
+            encoded_payload = check(bytes_to_unpadded_base64url)(token, state = state)
         header['alg'] = algorithm
         if algorithm_prefix == u'RS':
             if json_web_key_url is not None:
                 header['jku'] = json_web_key_url
             if key_id is not None:
                 header['kid'] = key_id
-        encoded_header = check(pipe(
-            make_json_to_str(encoding = 'utf-8', ensure_ascii = False, separators = (',', ':'), sort_keys = True),
-            make_bytes_to_base64url(remove_padding = True),
-            ))(header)
+        encoded_header = check(json_to_encoded_header)(header, state = state)
         secured_input = '{0}.{1}'.format(encoded_header, encoded_payload)
 #        if algorithm_prefix == u'ES':
 #            TODO
 #        elif algorithm_prefix == u'HS':
         if algorithm_prefix == u'HS':
-            signature = HMAC.new(shared_secret, msg = secured_input, digestmod = digest_constructor).digest()
+            signature = compute_hmac(hmac_prototype, secured_input)
         else:
             assert algorithm_prefix == u'RS'
             digest = digest_constructor.new(secured_input)
             signature = signer.sign(digest)
-        encoded_signature = check(make_bytes_to_base64url(remove_padding = True))(signature, state = state)
+        encoded_signature = check(bytes_to_unpadded_base64url)(signature, state = state)
         token = '{0}.{1}'.format(secured_input, encoded_signature)
         return token, None
     return sign_json_web_token_converter
@@ -1215,8 +1871,65 @@ def sign_json_web_token(algorithm = None, json_web_key_url = None, key_id = None
 
 def verify_decoded_json_web_token_signature(allowed_algorithms = None, public_key_as_encoded_str = None,
         public_key_as_json_web_key = None, shared_secret = None):
+    """Return a converter that verifies the signature of a decoded JSON Web Token.
+
+    *public_key_as_json_web_key* may be a :class:`biryani1.jwkconv.JsonWebKeySet`, in which case the RSA public key is
+    looked up using the ``kid`` header of each token (the last RSA key of the set being used when the token has no
+    ``kid``), among the keys used for signatures (see :meth:`biryani1.jwkconv.JsonWebKeySet.get_signature_item`).
+
+    >>> from Crypto.PublicKey import RSA
+    >>> from biryani1.jwkconv import JsonWebKeySet
+    >>> rsa_keys = [RSA.generate(1024) for index in range(2)]
+    >>> key_set = JsonWebKeySet(dict(jwk = [
+    ...     dict(
+    ...         alg = u'RSA',
+    ...         exp = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.e)),
+    ...         kid = unicode(index),
+    ...         mod = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.n)),
+    ...         )
+    ...     for index, rsa_key in enumerate(rsa_keys)
+    ...     ]))
+    >>> verify = pipe(
+    ...     decode_json_web_token,
+    ...     verify_decoded_json_web_token_signature(public_key_as_json_web_key = key_set),
+    ...     )
+    >>> for key_id in (u'0', u'1', None):
+    ...     token = check(pipe(
+    ...         make_payload_to_json_web_token(),
+    ...         sign_json_web_token(algorithm = 'RS256', key_id = key_id,
+    ...             private_key = rsa_keys[0 if key_id is None else int(key_id)].exportKey()),
+    ...         ))(u'Hello')
+    ...     print key_id, verify(token)[1] is None
+    0 True
+    1 True
+    None False
+    >>> token = check(pipe(
+    ...     make_payload_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = 'RS256', key_id = u'2', private_key = rsa_keys[0].exportKey()),
+    ...     ))(u'Hello')
+    >>> verify(token)[1]
+    {'signature': u'Unknown signature key'}
+    >>> pipe(
+    ...     decode_json_web_token,
+    ...     verify_decoded_json_web_token_signature(public_key_as_json_web_key = JsonWebKeySet(dict(jwk = [dict(
+    ...         key_set.get(kid = u'0'),
+    ...         use = u'enc',
+    ...         )]))),
+    ...     )(check(pipe(
+    ...         make_payload_to_json_web_token(),
+    ...         sign_json_web_token(algorithm = 'RS256', key_id = u'0', private_key = rsa_keys[0].exportKey()),
+    ...         ))(u'Hello'))[1]
+    {'signature': u'Unknown signature key'}
+    """
+    key_set = public_key_as_json_web_key if isinstance(public_key_as_json_web_key, JsonWebKeySet) else None
     if shared_secret is not None:
         assert isinstance(shared_secret, str)  # Shared secret must not be unicode.
+        hmac_prototype_by_size = dict(
+            (size, make_hmac_prototype(shared_secret, size))
+            for size in digest_constructor_by_size
+            )
+    verifier = make_rsa_signature_verifier(public_key_as_encoded_str = public_key_as_encoded_str,
+        public_key_as_json_web_key = public_key_as_json_web_key)
 
     def verify_decoded_json_web_token_signature_converter(value, state = None):
         if value is None:
@@ -1232,7 +1945,6 @@ def verify_decoded_json_web_token_signature(allowed_algorithms = None, public_ke
         elif algorithm in valid_signature_algorithms:
             algorithm_prefix = algorithm[:2]
             algorithm_size = int(algorithm[2:])
-            digest_constructor = digest_constructor_by_size[algorithm_size]
 #            if algorithm_prefix == u'ES':
 #                TODO
 #            elif algorithm_prefix == u'HS':
@@ -1241,30 +1953,26 @@ def verify_decoded_json_web_token_signature(allowed_algorithms = None, public_ke
                     errors['signature'] = state._(
                         u'Unable to check signature: Missing shared secret')
                 else:
-                    verified = HMAC.new(shared_secret, msg = value['secured_input'],
-                        digestmod = digest_constructor).digest() == value['signature']
+                    verified = constant_time_compare(compute_hmac(hmac_prototype_by_size[algorithm_size],
+                        value['secured_input']), value['signature'])
             else:
                 assert algorithm_prefix == u'RS'
-                if public_key_as_encoded_str is None:
-                    assert public_key_as_json_web_key is not None
-                    public_key_dict = public_key_as_json_web_key['jwk'][-1]  # TODO
-                    assert public_key_dict['alg'] == u'RSA', public_key_as_json_web_key  # TODO
-                    rsa_public_key = RSA.construct((
-                        number.bytes_to_long(check(make_base64url_to_bytes(add_padding = True))(
-                            public_key_dict['mod'], state = state)),
-                        number.bytes_to_long(check(make_base64url_to_bytes(add_padding = True))(
-                            public_key_dict['exp'], state = state)),
-                        ))
+                if key_set is None:
+                    assert verifier is not None
+                    token_verifier = verifier
                 else:
-                    rsa_public_key = RSA.importKey(public_key_as_encoded_str)
-                verifier = Signature_PKCS1_v1_5.new(rsa_public_key)
-                try:
-                    digest = digest_constructor.new(value['secured_input'])
-                    verified = verifier.verify(digest, value['signature'])
-                except:
-                    errors['signature'] = state._(u'Invalid signature')
-            if 'signature' not in errors and not verified:
-                errors['signature'] = state._(u'Non authentic signature')
+                    rsa_public_key = key_set.get_signature_item(kid = value['header'].get('kid'), alg = u'RSA')[1]
+                    token_verifier = Signature_PKCS1_v1_5.new(rsa_public_key) if rsa_public_key is not None \
+                        else None
+                if token_verifier is None:
+                    errors['signature'] = state._(u'Unknown signature key')
+                else:
+                    verified = verify_rsa_signature(token_verifier, algorithm_size, value['secured_input'],
+                        value['signature'])
+            if 'signature' not in errors:
+                signature_error = get_signature_error(verified, state)
+                if signature_error is not None:
+                    errors['signature'] = signature_error
         elif algorithm != u'none':
             errors['header'] = dict(alg = state._(
                 u'Unimplemented digital signature algorithm'))
@@ -1272,24 +1980,209 @@ def verify_decoded_json_web_token_signature(allowed_algorithms = None, public_ke
     return verify_decoded_json_web_token_signature_converter
 
 
-def verify_decoded_json_web_token_time():
-    now_timestamp = calendar.timegm(datetime.datetime.utcnow().timetuple())
-    return struct(
-        dict(
-            claims = struct(
-                dict(
-                    exp = test(lambda timestamp: now_timestamp - 300 < timestamp,  # Allow 5 minutes drift.
-                        error = N_(u'Expired JSON web token'),
-                        ),
-                    iat = test_less_or_equal(now_timestamp + 300,  # Allow 5 minutes drift.
-                        error = N_(u'JSON web token issued in the future'),
-                        ),
-                    nbf = test(lambda timestamp: now_timestamp + 300 >= timestamp,  # Allow 5 minutes drift.
-                        error = N_(u'JSON web token not yet valid'),
-                        ),
-                    ),
-                default = noop,
-                ),
-            ),
-        default = noop,
+def verify_decoded_json_web_token_time(clock = None, drift = 300):
+    """Return a converter that checks the ``exp``, ``iat`` & ``nbf`` claims of a decoded JSON Web Token.
+
+    The current time is read (using *clock*, a function returning the current timestamp, ``time.time`` by default)
+    each time the converter is called, so the converter can be built once and for all (for example at module level).
+    *drift* is the number of seconds of allowed clock skew.
+
+    >>> now = [1300819380]
+    >>> verify_time = verify_decoded_json_web_token_time(clock = lambda: now[0], drift = 60)
+    >>> decoded_token = dict(claims = dict(exp = 1300819380 + 30, iat = 1300819380, iss = u'joe'))
+    >>> verify_time(decoded_token)[1] is None
+    True
+    >>> now[0] += 120
+    >>> verify_time(decoded_token)[1]
+    {'claims': {'exp': u'Expired JSON web token'}}
+    >>> verify_time(dict(claims = dict(nbf = now[0] + 90)))
+    ({'claims': {'nbf': 1300819590}}, {'claims': {'nbf': u'JSON web token not yet valid'}})
+    >>> verify_time(dict(claims = None))
+    ({'claims': None}, None)
+    >>> verify_time(None)
+    (None, None)
+    """
+    if clock is None:
+        clock = time.time
+
+    def verify_decoded_json_web_token_time_converter(decoded_token, state = None):
+        if decoded_token is None:
+            return None, None
+        claims = decoded_token.get('claims')
+        if not claims:
+            return decoded_token, None
+        now_timestamp = clock()
+        errors = {}
+        expiration = claims.get('exp')
+        if expiration is not None and not now_timestamp - drift < expiration:
+            errors['exp'] = N_(u'Expired JSON web token')
+        issued_at = claims.get('iat')
+        if issued_at is not None and not issued_at <= now_timestamp + drift:
+            errors['iat'] = N_(u'JSON web token issued in the future')
+        not_before = claims.get('nbf')
+        if not_before is not None and not now_timestamp + drift >= not_before:
+            errors['nbf'] = N_(u'JSON web token not yet valid')
+        if not errors:
+            return decoded_token, None
+        if state is None:
+            state = states.default_state
+        return decoded_token, dict(claims = dict(
+            (name, state._(message))
+            for name, message in errors.iteritems()
+            ))
+    return verify_decoded_json_web_token_time_converter
+
+
+def verify_many(tokens, allowed_algorithms = None, chunk_size = 64, executor = None, public_key_as_encoded_str = None,
+        public_key_as_json_web_key = None, shared_secret = None, state = None, verify_time = True):
+    """Decode, check claims, time and signature of a list of JSON Web Tokens and return the list of their
+    ``(decoded_token, error)`` results.
+
+    The verifiers (parsed RSA key, keyed HMACs, time limits) are built once for the whole list, and identical tokens
+    are verified only once.
+
+    When an *executor* is given (an object with a ``map(function, iterable)`` method, like a
+    ``multiprocessing.Pool``, a ``multiprocessing.pool.ThreadPool`` or a ``concurrent.futures`` executor), the
+    verification of RSA signatures, which is by far the most expensive step, is spread over its workers, by chunks of
+    at most *chunk_size* tokens sharing the same key. Each worker parses the key once per chunk.
+
+    >>> from multiprocessing.pool import ThreadPool
+    >>> from Crypto.PublicKey import RSA
+    >>> rsa_key = RSA.generate(1024)
+    >>> claims = dict(exp = int(time.time()) + 3600, iss = u'joe')
+    >>> hs256_token = check(pipe(
+    ...     make_json_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = u'HS256', shared_secret = 'secret'),
+    ...     ))(claims)
+    >>> rs256_token = check(pipe(
+    ...     make_json_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = u'RS256', private_key = rsa_key.exportKey()),
+    ...     ))(claims)
+    >>> expired_token = check(pipe(
+    ...     make_json_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = u'HS256', shared_secret = 'secret'),
+    ...     ))(dict(exp = 1300819380, iss = u'joe'))
+    >>> tampered_token = rs256_token[:-10] + ('B' if rs256_token[-10] == 'A' else 'A') + rs256_token[-9:]
+    >>> tokens = [hs256_token, rs256_token, hs256_token, tampered_token, expired_token, None]
+    >>> results = verify_many(tokens, public_key_as_encoded_str = rsa_key.publickey().exportKey(),
+    ...     shared_secret = 'secret')
+    >>> [(decoded_token['claims']['iss'] if decoded_token is not None else None, error)
+    ...     for decoded_token, error in results]
+    [(u'joe', None), (u'joe', None), (u'joe', None), (u'joe', {'signature': u'Non authentic signature'}), \
+(u'joe', {'claims': {'exp': u'Expired JSON web token'}}), (None, None)]
+    >>> duplicate_results = verify_many([hs256_token, hs256_token], shared_secret = 'secret')
+    >>> duplicate_results[0][0]['claims']['iss'] = u'jane'
+    >>> duplicate_results[1][0]['claims']['iss']
+    u'joe'
+    >>> pool = ThreadPool(2)
+    >>> verify_many(tokens, executor = pool, public_key_as_encoded_str = rsa_key.publickey().exportKey(),
+    ...     shared_secret = 'secret') == results
+    True
+    >>> from biryani1.jwkconv import JsonWebKeySet
+    >>> key_set = JsonWebKeySet(dict(jwk = [dict(
+    ...     alg = u'RSA',
+    ...     exp = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.e)),
+    ...     mod = check(bytes_to_unpadded_base64url)(number.long_to_bytes(rsa_key.n)),
+    ...     )]))
+    >>> verify_many(tokens, executor = pool, public_key_as_json_web_key = key_set,
+    ...     shared_secret = 'secret') == results
+    True
+    >>> pool.close()
+    """
+    if state is None:
+        state = states.default_state
+    decoded_token_converter = pipe(
+        decode_json_web_token,
+        decode_json_web_token_claims,
+        verify_decoded_json_web_token_time() if verify_time else noop,
         )
+    signature_verifier = verify_decoded_json_web_token_signature(allowed_algorithms = allowed_algorithms,
+        public_key_as_encoded_str = public_key_as_encoded_str,
+        public_key_as_json_web_key = public_key_as_json_web_key, shared_secret = shared_secret)
+    key_set = public_key_as_json_web_key if isinstance(public_key_as_json_web_key, JsonWebKeySet) else None
+
+    result_by_token = {}
+    # Pooled tokens, grouped by the (picklable) JSON Web Key Set that contains only their key
+    pooled_decoded_tokens_by_key_id = {}
+    public_key_as_json_web_key_by_key_id = {}
+    for token in tokens:
+        if token is None or token in result_by_token:
+            continue
+        decoded_token, error = decoded_token_converter(token, state = state)
+        if error is None:
+            algorithm = decoded_token['header'].get('alg')
+            if executor is not None and algorithm in valid_signature_algorithms and algorithm.startswith(u'RS') \
+                    and (allowed_algorithms is None or algorithm in allowed_algorithms):
+                if key_set is None:
+                    pooled_decoded_tokens_by_key_id.setdefault(None, []).append(decoded_token)
+                    public_key_as_json_web_key_by_key_id[None] = public_key_as_json_web_key
+                    continue
+                json_web_key = key_set.get_signature_item(kid = decoded_token['header'].get('kid'), alg = u'RSA')[0]
+                if json_web_key is not None:
+                    # Give workers only the key of the token.
+                    key_id = id(json_web_key)
+                    pooled_decoded_tokens_by_key_id.setdefault(key_id, []).append(decoded_token)
+                    public_key_as_json_web_key_by_key_id[key_id] = dict(jwk = [json_web_key])
+                    continue
+            decoded_token, error = signature_verifier(decoded_token, state = state)
+        result_by_token[token] = (decoded_token, error)
+    if pooled_decoded_tokens_by_key_id:
+        chunks = [
+            (group_key_id, group_decoded_tokens[index:index + chunk_size])
+            for group_key_id, group_decoded_tokens in pooled_decoded_tokens_by_key_id.iteritems()
+            for index in xrange(0, len(group_decoded_tokens), chunk_size)
+            ]
+        chunks_verifications = executor.map(verify_rsa_json_web_token_signatures, [
+            (public_key_as_encoded_str, public_key_as_json_web_key_by_key_id[chunk_key_id], [
+                (chunk_decoded_token['header']['alg'], chunk_decoded_token['secured_input'],
+                    chunk_decoded_token['signature'])
+                for chunk_decoded_token in chunk
+                ])
+            for chunk_key_id, chunk in chunks
+            ])
+        for (key_id, chunk), verifications in zip(chunks, chunks_verifications):
+            for decoded_token, verified in zip(chunk, verifications):
+                signature_error = get_signature_error(verified, state)
+                result_by_token[decoded_token['token']] = (decoded_token,
+                    dict(signature = signature_error) if signature_error is not None else None)
+
+    results = []
+    for token in tokens:
+        if token is None:
+            results.append((None, None))
+        else:
+            decoded_token, error = result_by_token[token]
+            # Give each duplicate token its own copy, that can be modified without altering the others.
+            results.append((copy.deepcopy(decoded_token), error))
+    return results
+
+
+def verify_rsa_json_web_token_signatures(arguments):
+    """Verify the RSA signatures of JSON Web Tokens signed with the same key and return the list of their results:
+    ``True``, ``False``, or ``None`` when a signature is invalid.
+
+    *arguments* is a ``(public_key_as_encoded_str, public_key_as_json_web_key, signed_items)`` tuple of picklable
+    values, where *signed_items* is a list of ``(algorithm, secured_input, signature)`` tuples, so that this function
+    can be mapped by the workers of a process pool. The key is parsed once for all the signatures.
+
+    >>> from Crypto.PublicKey import RSA
+    >>> rsa_key = RSA.generate(1024)
+    >>> decoded_token = check(pipe(
+    ...     make_payload_to_json_web_token(),
+    ...     sign_json_web_token(algorithm = u'RS256', private_key = rsa_key.exportKey()),
+    ...     decode_json_web_token,
+    ...     ))(u'Hello')
+    >>> verify_rsa_json_web_token_signatures((rsa_key.publickey().exportKey(), None, [
+    ...     (u'RS256', decoded_token['secured_input'], decoded_token['signature']),
+    ...     (u'RS256', decoded_token['secured_input'] + 'x', decoded_token['signature']),
+    ...     ]))
+    [True, False]
+    """
+    public_key_as_encoded_str, public_key_as_json_web_key, signed_items = arguments
+    verifier = make_rsa_signature_verifier(public_key_as_encoded_str = public_key_as_encoded_str,
+        public_key_as_json_web_key = public_key_as_json_web_key)
+    assert verifier is not None
+    return [
+        verify_rsa_signature(verifier, int(algorithm[2:]), secured_input, signature)
+        for algorithm, secured_input, signature in signed_items
+        ]
@@ -25,27 +25,283 @@
 """Network Related Converters
 
 .. note:: Network converters are not in :mod:`biryani1.baseconv`, because they use non-standard network libraries.
+
+.. note:: Asynchronous converters and tests of many values also need the ``concurrent.futures`` library (``futures``
+   package, see :mod:`biryani1.asyncconv`), which is imported only when they are used.
 """
 
 
+import httplib
 import socket
+import threading
+import time
 import urllib2
+import urlparse
 
 import DNS  # from pyDNS
-DNS.DiscoverNameServers()
 
 from . import states
 
 
 __all__ = [
+    'async_test_email',
+    'async_test_http_url',
+    'discover_name_servers',
+    'HttpConnectionPool',
+    'resolve_dns',
     'test_email',
     'test_http_url',
+    'test_many_emails',
+    'test_many_http_urls',
     ]
 
 
-def test_email():
+name_servers_discovered = False
+name_servers_discovery_lock = threading.Lock()
+
+
+class HttpConnectionPool(object):
+    """Thread-safe pool of keep-alive HTTP & HTTPS connections, opening at most *max_connections_per_host*
+    simultaneous connections to each host.
+
+    *timeout* is the timeout (in seconds) of each socket operation.
+    """
+    def __init__(self, max_connections_per_host = 4, timeout = 10):
+        assert max_connections_per_host > 0, max_connections_per_host
+        self.connections_by_host = {}
+        self.lock = threading.Lock()
+        self.max_connections_per_host = max_connections_per_host
+        self.semaphore_by_host = {}
+        self.timeout = timeout
+
+    def close(self):
+        """Close every idle connection."""
+        with self.lock:
+            for connections in self.connections_by_host.itervalues():
+                for connection in connections:
+                    connection.close()
+            self.connections_by_host.clear()
+
+    def request(self, method, url, headers = None):
+        """Send a request and return its response.
+
+        The body of the response is read (so that the connection can be reused), except for a ``GET`` request not
+        answered with a partial content: Its connection is closed instead.
+        """
+        split_url = urlparse.urlsplit(url)
+        host = (split_url.scheme, split_url.netloc)
+        path = urlparse.urlunsplit(('', '', split_url.path or '/', split_url.query, ''))
+        with self.lock:
+            semaphore = self.semaphore_by_host.get(host)
+            if semaphore is None:
+                semaphore = self.semaphore_by_host[host] = threading.BoundedSemaphore(self.max_connections_per_host)
+        with semaphore:
+            with self.lock:
+                connections = self.connections_by_host.get(host)
+                connection = connections.pop() if connections else None
+            while True:
+                reused = connection is not None
+                if connection is None:
+                    connection_class = httplib.HTTPSConnection if split_url.scheme == 'https' \
+                        else httplib.HTTPConnection
+                    connection = connection_class(split_url.netloc, timeout = self.timeout)
+                try:
+                    connection.request(method, path, headers = headers or {})
+                    response = connection.getresponse()
+                    if method == 'GET' and response.status != 206:
+                        # Don't download a whole document, only to keep its connection alive.
+                        connection.close()
+                        return response
+                    response.read()
+                except (httplib.HTTPException, socket.error):
+                    connection.close()
+                    if not reused:
+                        raise
+                    # The kept-alive connection has been closed by the server. Retry with a new one.
+                    connection = None
+                    continue
+                break
+            if response.will_close:
+                connection.close()
+            else:
+                with self.lock:
+                    self.connections_by_host.setdefault(host, []).append(connection)
+            return response
+
+
+def async_test_email(cache = None, executor = None, name_servers = None, negative_ttl = 300, positive_ttl = 3600,
+        resolver = None, transient_ttl = None):
+    """Return an asynchronous converter (see :mod:`biryani1.asyncconv`) that tries to ensure than a (already validated)
+    email address really exists.
+
+    The test is done by :func:`test_email` (which describes the other parameters) in *executor* (a
+    ``concurrent.futures`` executor, a module-wide thread pool executor by default), except when the domain of the
+    email address is already in *cache*.
+
+    >>> from biryani1.caches import LRUCache
+    >>> def stub_resolver(domain, qtype, name_servers = None):
+    ...     return [u'192.0.2.1'] if domain == u'example.com' else []
+    >>> converter = async_test_email(cache = LRUCache(), resolver = stub_resolver)
+    >>> future = converter(u'john@example.com')
+    >>> future.result()
+    (u'john@example.com', None)
+    >>> converter(u'jane@example.com').done()
+    True
+    >>> converter(u'john@example.org').result()
+    (u'john@example.org', u'Domain "example.org" doesn\\'t exist')
+    >>> converter(None).result()
+    (None, None)
+    """
+    from .asyncconv import completed_future, make_async_converter
+
+    converter = test_email(cache = cache, name_servers = name_servers, negative_ttl = negative_ttl,
+        positive_ttl = positive_ttl, resolver = resolver, transient_ttl = transient_ttl)
+    async_converter = make_async_converter(converter, executor = executor)
+
+    def async_test_email_converter(value, state = None):
+        if value is None or cache is not None and cache.get(value.split('@', 1)[1].lower()) is not None:
+            # Nothing to resolve: Don't wait for a worker of the executor.
+            return completed_future(converter(value, state = state))
+        return async_converter(value, state = state)
+    return async_test_email_converter
+
+
+def async_test_http_url(valid_status_codes = None, cache = None, executor = None, negative_ttl = 300,
+        positive_ttl = 3600, transient_ttl = None):
+    """Return an asynchronous converter (see :mod:`biryani1.asyncconv`) that tries to ensure than a (already validated)
+    URL really works.
+
+    The test is done by :func:`test_http_url` (which describes the other parameters) in *executor* (a
+    ``concurrent.futures`` executor, a module-wide thread pool executor by default), except when the URL is already
+    in *cache*.
+
+    >>> async_test_http_url()(None).result()
+    (None, None)
+    """
+    from .asyncconv import completed_future, make_async_converter
+
+    converter = test_http_url(valid_status_codes = valid_status_codes, cache = cache, negative_ttl = negative_ttl,
+        positive_ttl = positive_ttl, transient_ttl = transient_ttl)
+    async_converter = make_async_converter(converter, executor = executor)
+
+    def async_test_http_url_converter(value, state = None):
+        if value is None or cache is not None and cache.get(value) is not None:
+            # Nothing to request: Don't wait for a worker of the executor.
+            return completed_future(converter(value, state = state))
+        return async_converter(value, state = state)
+    return async_test_http_url_converter
+
+
+def cache_check_result(cache, key, result, ttl):
+    """Keep the result of a network check in *cache* during *ttl* seconds.
+
+    *cache* is either ``None`` (no caching) or an object with the interface of :class:`biryani1.caches.LRUCache`, like
+    :class:`biryani1.caches.SqliteCache`. A ``None`` *ttl* means that the result must not be cached.
+    """
+    if cache is not None and ttl is not None:
+        cache.set(key, result, expiration = cache.clock() + ttl)
+
+
+def discover_name_servers():
+    """Read the name servers of the system (from ``/etc/resolv.conf`` or from the Windows registry) the first time it
+    is called, and return their list.
+
+    Discovery is done lazily (instead of when this module is imported), only once, even when called concurrently.
+
+    >>> discover_name_servers() is discover_name_servers()
+    True
+    """
+    global name_servers_discovered
+    if not name_servers_discovered:
+        with name_servers_discovery_lock:
+            if not name_servers_discovered:
+                DNS.DiscoverNameServers()
+                name_servers_discovered = True
+    return DNS.defaults['server']
+
+
+def get_email_domain_status(domain, cache = None, name_servers = None, negative_ttl = 300, positive_ttl = 3600,
+        resolver = None, transient_ttl = None):
+    """Return a ``(exists, error)`` couple telling whether an email domain exists, or giving the message of the
+    network or DNS error that occurred while trying to resolve it.
+
+    Answers are kept in *cache* (see :func:`cache_check_result`) during *positive_ttl* seconds when the domain exists,
+    *negative_ttl* seconds when it doesn't and *transient_ttl* seconds after an error.
+    """
+    if cache is not None:
+        status = cache.get(domain)
+        if status is not None:
+            return tuple(status)
+    if resolver is None:
+        resolver = resolve_dns
+    try:
+        # For an email domain to be considered valid, either A or MX request should work (both are not needed).
+        exists = bool(resolver(domain, 'a', name_servers = name_servers) or
+            resolver(domain, 'mx', name_servers = name_servers))
+    except (socket.error, DNS.DNSError), e:
+        status = (None, unicode(e))
+        ttl = transient_ttl
+    else:
+        status = (exists, None)
+        ttl = positive_ttl if exists else negative_ttl
+    cache_check_result(cache, domain, status, ttl)
+    return status
+
+
+def get_http_url_status(url, connection_pool, max_redirections = 5):
+    """Return the ``(status, reason)`` couple of the response to a ``HEAD`` request of an URL, following redirections.
+
+    When the web server doesn't allow ``HEAD`` requests, a ``GET`` request of the first byte of the document is sent
+    instead. When the URL is still redirected after *max_redirections* redirections, an ``httplib.HTTPException`` is
+    raised.
+    """
+    for redirection_index in range(max_redirections + 1):
+        response = connection_pool.request('HEAD', url, headers = {'User-Agent': 'Mozilla/5.0'})
+        if response.status in (405, 501):
+            response = connection_pool.request('GET', url, headers = {
+                'Range': 'bytes=0-0',
+                'User-Agent': 'Mozilla/5.0',
+                })
+        location = response.getheader('location')
+        if response.status not in (301, 302, 303, 307, 308) or not location:
+            return response.status, response.reason
+        url = urlparse.urljoin(url, location)
+    raise httplib.HTTPException('Too many redirections')
+
+
+def get_http_url_status_ttl(status, negative_ttl = 300, positive_ttl = 3600, transient_ttl = None):
+    """Return the duration (in seconds) during which an URL ``(code, reason, error)`` status can be cached."""
+    if status[2] is not None:
+        return transient_ttl
+    return negative_ttl if status[0] >= 400 else positive_ttl
+
+
+def resolve_dns(domain, qtype, name_servers = None, timeout = 10):
+    """Send a DNS request and return the list of its answers.
+
+    This is the default resolver of email tests. *name_servers* is the list of the addresses of the name servers to
+    query. When it is missing, the name servers of the system are used.
+    """
+    server = name_servers if name_servers is not None else discover_name_servers()
+    return DNS.DnsRequest(domain, qtype = qtype, server = server, timeout = timeout).req().answers
+
+
+def test_email(cache = None, name_servers = None, negative_ttl = 300, positive_ttl = 3600, resolver = None,
+        transient_ttl = None):
     """Try to ensure than a (already validated) email address really exists.
 
+    *name_servers* is the list of the addresses of the name servers to query. When it is missing, the name servers of
+    the system are discovered at the first test.
+
+    *resolver* is a function with the same signature as :func:`resolve_dns`, which is the default resolver.
+
+    When a *cache* is given (see :func:`cache_check_result`), the existence of each domain is kept during
+    *positive_ttl* seconds, its non-existence during *negative_ttl* seconds and connection errors during
+    *transient_ttl* seconds (they are not cached by default).
+
+    .. note:: Cache keys are domains only: A cache should not be shared by converters using different resolvers or
+       name servers.
+
     .. warning:: Like most converters, a ``None`` value is not tested.
 
     >>> test_email()(u'info@easter-eggs.com')
@@ -64,6 +320,23 @@ def test_email():
     (None, None)
     >>> test_email()(None)
     (None, None)
+
+    Usage with a stub resolver and a cache:
+
+    >>> requests = []
+    >>> def stub_resolver(domain, qtype, name_servers = None):
+    ...     requests.append((domain, qtype))
+    ...     return [u'192.0.2.1'] if domain == u'example.com' and qtype == 'mx' else []
+    >>> from biryani1.caches import LRUCache
+    >>> converter = test_email(cache = LRUCache(), resolver = stub_resolver)
+    >>> converter(u'john@example.com')
+    (u'john@example.com', None)
+    >>> converter(u'jane@example.com')
+    (u'jane@example.com', None)
+    >>> converter(u'john@example.org')
+    (u'john@example.org', u'Domain "example.org" doesn\\'t exist')
+    >>> requests
+    [(u'example.com', 'a'), (u'example.com', 'mx'), (u'example.org', 'a'), (u'example.org', 'mx')]
     """
     def test_email_converter(value, state = None):
         if value is None:
@@ -71,23 +344,26 @@ def test_email():
         if state is None:
             state = states.default_state
         username, domain = value.split('@', 1)
-        try:
-            # For an email domain to be considered valid, either A or MX request should work (both are not needed).
-            answers = DNS.DnsRequest(domain, qtype= 'a', timeout = 10).req().answers
-            if not answers:
-                answers = DNS.DnsRequest(domain, qtype = 'mx', timeout = 10).req().answers
-        except (socket.error, DNS.DNSError), e:
+        exists, e = get_email_domain_status(domain.lower(), cache = cache, name_servers = name_servers,
+            negative_ttl = negative_ttl, positive_ttl = positive_ttl, resolver = resolver,
+            transient_ttl = transient_ttl)
+        if e is not None:
             return value, state._(
                 u'An error occured when trying to connect to the email server: {0}').format(e)
-        if not answers:
+        if not exists:
             return value, state._(u'''Domain "{0}" doesn't exist''').format(domain)
         return value, None
     return test_email_converter
 
 
-def test_http_url(valid_status_codes = None):
+def test_http_url(valid_status_codes = None, cache = None, negative_ttl = 300, positive_ttl = 3600,
+        transient_ttl = None):
     """Return a converters that tries to ensure than a (already validated) URL really works.
 
+    When a *cache* is given (see :func:`cache_check_result`), the status of each URL is kept during *positive_ttl*
+    seconds when it is successful, *negative_ttl* seconds when it is an error status and connection errors during
+    *transient_ttl* seconds (they are not cached by default).
+
     .. warning:: Like most converters, a ``None`` value is not tested.
 
     >>> test_http_url()(u'http://www.easter-eggs.com/')
@@ -115,20 +391,264 @@ u'An error occured when trying to connect to the web server: <urlopen error [Err
             return value, None
         if state is None:
             state = states.default_state
-        request = urllib2.Request(value)
-        request.add_header('User-Agent', 'Mozilla/5.0')
-        try:
-            response = urllib2.urlopen(request).read()
-        except urllib2.HTTPError, response:
-            if 200 <= response.code < 400:
-                return value, state._(
-                    u'An error occured when trying to connect to the web server: {0:d} {1}').format(
-                    response.code, response.msg)
-            if response.code not in (valid_status_codes or []):
-                return value, state._(
-                    u'The web server responded with a bad status code: {0:d} {1}').format(response.code, response.msg)
-        except urllib2.URLError, e:
+        status = cache.get(value) if cache is not None else None
+        if status is None:
+            request = urllib2.Request(value)
+            request.add_header('User-Agent', 'Mozilla/5.0')
+            try:
+                response = urllib2.urlopen(request)
+                response.read()
+                status = (response.code, response.msg, None)
+            except urllib2.HTTPError, response:
+                if 200 <= response.code < 400:
+                    status = (None, None, u'{0:d} {1}'.format(response.code, response.msg))
+                else:
+                    status = (response.code, response.msg, None)
+            except urllib2.URLError, e:
+                status = (None, None, unicode(e))
+            cache_check_result(cache, value, status, get_http_url_status_ttl(status, negative_ttl = negative_ttl,
+                positive_ttl = positive_ttl, transient_ttl = transient_ttl))
+        code, reason, e = status
+        if e is not None:
             return value, state._(
                 u'An error occured when trying to connect to the web server: {0}').format(e)
+        if code >= 400 and code not in (valid_status_codes or []):
+            return value, state._(u'The web server responded with a bad status code: {0:d} {1}').format(code, reason)
         return value, None
     return test_http_url_converter
+
+
+def test_many_emails(values, cache = None, executor = None, name_servers = None, negative_ttl = 300,
+        positive_ttl = 3600, resolver = None, state = None, transient_ttl = None):
+    """Try to ensure that each (already validated) email address of a list really exists, and return the list of
+    their ``(value, error)`` results.
+
+    Each domain is resolved only once (case-insensitively), and distinct domains are resolved concurrently in
+    *executor* (a ``concurrent.futures`` executor, the module-wide thread pool executor of :mod:`biryani1.asyncconv`
+    by default).
+
+    Answers are kept in *cache* (when given) like in :func:`test_email`, which also describes the other parameters.
+
+    >>> from biryani1.caches import LRUCache
+    >>> requested_domains = []
+    >>> def stub_resolver(domain, qtype, name_servers = None):
+    ...     if domain == u'timeout.example.com':
+    ...         raise DNS.DNSError('Timeout')
+    ...     requested_domains.append(domain)
+    ...     return [u'192.0.2.1'] if domain.endswith(u'.com') else []
+    >>> cache = LRUCache()
+    >>> test_many_emails([u'john@example.com', None, u'jane@Example.com', u'joe@example.net',
+    ...     u'jim@timeout.example.com'], cache = cache, resolver = stub_resolver)
+    [(u'john@example.com', None), (None, None), (u'jane@Example.com', None), \
+(u'joe@example.net', u'Domain "example.net" doesn\\'t exist'), \
+(u'jim@timeout.example.com', u'An error occured when trying to connect to the email server: Timeout')]
+    >>> sorted(requested_domains)
+    [u'example.com', u'example.net', u'example.net']
+    >>> test_many_emails([u'jack@example.com', u'jill@example.net'], cache = cache, resolver = stub_resolver)
+    [(u'jack@example.com', None), (u'jill@example.net', u'Domain "example.net" doesn\\'t exist')]
+    >>> len(requested_domains)
+    3
+
+    Usage with a file-backed cache, also keeping connection errors during a minute:
+
+    >>> from biryani1.caches import SqliteCache
+    >>> sqlite_cache = SqliteCache(':memory:')
+    >>> test_many_emails([u'john@example.com', u'jim@timeout.example.com'], cache = sqlite_cache,
+    ...     resolver = stub_resolver, transient_ttl = 60)[0]
+    (u'john@example.com', None)
+    >>> sorted(sqlite_cache.keys())
+    [u'example.com', u'timeout.example.com']
+    >>> test_many_emails([u'jack@example.com'], cache = sqlite_cache, resolver = stub_resolver)
+    [(u'jack@example.com', None)]
+    >>> len(requested_domains)
+    4
+    """
+    if state is None:
+        state = states.default_state
+    domains = sorted(set(
+        value.split('@', 1)[1].lower()
+        for value in values
+        if value is not None
+        ))
+
+    def get_domain_status(domain):
+        return get_email_domain_status(domain, cache = cache, name_servers = name_servers,
+            negative_ttl = negative_ttl, positive_ttl = positive_ttl, resolver = resolver,
+            transient_ttl = transient_ttl)
+
+    if executor is None and len(domains) <= 1:
+        statuses = map(get_domain_status, domains)
+    else:
+        from .asyncconv import get_default_executor
+        statuses = (executor or get_default_executor()).map(get_domain_status, domains)
+    status_by_domain = dict(zip(domains, statuses))
+
+    results = []
+    for value in values:
+        if value is None:
+            results.append((value, None))
+            continue
+        domain = value.split('@', 1)[1]
+        exists, e = status_by_domain[domain.lower()]
+        if e is not None:
+            results.append((value, state._(
+                u'An error occured when trying to connect to the email server: {0}').format(e)))
+        elif not exists:
+            results.append((value, state._(u'''Domain "{0}" doesn't exist''').format(domain)))
+        else:
+            results.append((value, None))
+    return results
+
+
+def test_many_http_urls(values, cache = None, connection_pool = None, executor = None, negative_ttl = 300,
+        positive_ttl = 3600, state = None, total_timeout = None, transient_ttl = None, valid_status_codes = None):
+    """Try to ensure that each (already validated) URL of a list really works, and return the list of their
+    ``(value, error)`` results.
+
+    Unlike :func:`test_http_url`, documents are not downloaded: A ``HEAD`` request is sent (or, when the web server
+    doesn't allow it, a ``GET`` request of the first byte of the document) using kept-alive connections of
+    *connection_pool* (a new :class:`HttpConnectionPool` by default), which also limits the number of simultaneous
+    connections to each host.
+
+    Each distinct URL is tested only once, and URLs are tested concurrently in *executor* (a ``concurrent.futures``
+    executor, the module-wide thread pool executor of :mod:`biryani1.asyncconv` by default). The whole test lasts at
+    most *total_timeout* seconds: URLs whose test isn't over by then are considered in error (their late status is
+    still cached, when there is a cache). URLs still redirected after 5 redirections are also considered in error.
+
+    The status of each URL is kept in *cache* (when given) like in :func:`test_http_url`, which describes the
+    parameters used for caching.
+
+    >>> import BaseHTTPServer, SocketServer, threading, time
+    >>> from biryani1.caches import LRUCache
+    >>> class RequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    ...     protocol_version = 'HTTP/1.1'
+    ...     def do_GET(self):
+    ...         self.send_response(206 if self.path == '/no-head' else 200)
+    ...         self.send_header('Content-Length', '1')
+    ...         self.end_headers()
+    ...         self.wfile.write('x')
+    ...     def do_HEAD(self):
+    ...         requested_paths.append(self.path)
+    ...         if self.path == '/slow':
+    ...             time.sleep(1)
+    ...         status = dict([('/', 200), ('/loop', 302), ('/moved', 301), ('/no-head', 405), ('/slow', 200)]).get(
+    ...             self.path, 404)
+    ...         self.send_response(status)
+    ...         if status == 301:
+    ...             self.send_header('Location', '/')
+    ...         elif status == 302:
+    ...             self.send_header('Location', '/loop')
+    ...         self.send_header('Content-Length', '0')
+    ...         self.end_headers()
+    ...     def log_message(self, format, *args):
+    ...         pass
+    >>> class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    ...     daemon_threads = True
+    >>> server = Server(('127.0.0.1', 0), RequestHandler)
+    >>> server_thread = threading.Thread(target = server.serve_forever)
+    >>> server_thread.start()
+    >>> base_url = u'http://127.0.0.1:{0:d}'.format(server.server_address[1])
+    >>> requested_paths = []
+    >>> connection_pool = HttpConnectionPool(max_connections_per_host = 2)
+    >>> cache = LRUCache()
+    >>> test_many_http_urls([base_url + u'/', base_url + u'/moved', None, base_url + u'/missing',
+    ...     base_url + u'/no-head', base_url + u'/'], cache = cache, connection_pool = connection_pool) == [
+    ...     (base_url + u'/', None),
+    ...     (base_url + u'/moved', None),
+    ...     (None, None),
+    ...     (base_url + u'/missing', u'The web server responded with a bad status code: 404 Not Found'),
+    ...     (base_url + u'/no-head', None),
+    ...     (base_url + u'/', None),
+    ...     ]
+    True
+    >>> sorted(requested_paths)
+    ['/', '/', '/missing', '/moved', '/no-head']
+    >>> len(connection_pool.connections_by_host[('http', base_url[7:])]) <= 2
+    True
+    >>> test_many_http_urls([base_url + u'/missing'], cache = cache, connection_pool = connection_pool,
+    ...     valid_status_codes = [404]) == [(base_url + u'/missing', None)]
+    True
+    >>> len(requested_paths)
+    5
+    >>> test_many_http_urls([base_url + u'/loop'], cache = cache, connection_pool = connection_pool) == [
+    ...     (base_url + u'/loop', u'An error occured when trying to connect to the web server: Too many redirections'),
+    ...     ]
+    True
+    >>> requested_paths.count('/loop')
+    6
+    >>> test_many_http_urls([base_url + u'/', base_url + u'/slow'], cache = cache, connection_pool = connection_pool,
+    ...     total_timeout = 0.2) == [
+    ...     (base_url + u'/', None),
+    ...     (base_url + u'/slow', u'An error occured when trying to connect to the web server: timed out'),
+    ...     ]
+    True
+    >>> connection_pool.close()
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+    if state is None:
+        state = states.default_state
+    urls = sorted(set(
+        value
+        for value in values
+        if value is not None
+        ))
+    own_connection_pool = connection_pool is None
+    if own_connection_pool:
+        connection_pool = HttpConnectionPool()
+    deadline = time.time() + total_timeout if total_timeout is not None else None
+
+    def get_url_status(url):
+        if cache is not None:
+            status = cache.get(url)
+            if status is not None:
+                return tuple(status)
+        if deadline is not None and time.time() >= deadline:
+            return None, None, u'timed out'
+        try:
+            status = get_http_url_status(url, connection_pool) + (None,)
+        except (httplib.HTTPException, socket.error), e:
+            status = (None, None, unicode(e))
+        cache_check_result(cache, url, status, get_http_url_status_ttl(status, negative_ttl = negative_ttl,
+            positive_ttl = positive_ttl, transient_ttl = transient_ttl))
+        return status
+
+    try:
+        if executor is None and deadline is None and len(urls) <= 1:
+            statuses = map(get_url_status, urls)
+        else:
+            from concurrent.futures import TimeoutError
+            from .asyncconv import get_default_executor
+            futures = [
+                (executor or get_default_executor()).submit(get_url_status, url)
+                for url in urls
+                ]
+            statuses = []
+            for future in futures:
+                try:
+                    status = future.result(timeout = max(deadline - time.time(), 0) if deadline is not None else None)
+                except TimeoutError:
+                    # The test goes on in the background, but its status is not waited for.
+                    future.cancel()
+                    status = (None, None, u'timed out')
+                statuses.append(status)
+    finally:
+        if own_connection_pool:
+            connection_pool.close()
+    status_by_url = dict(zip(urls, statuses))
+
+    results = []
+    for value in values:
+        if value is None:
+            results.append((value, None))
+            continue
+        code, reason, e = status_by_url[value]
+        if e is not None:
+            results.append((value, state._(
+                u'An error occured when trying to connect to the web server: {0}').format(e)))
+        elif code >= 400 and code not in (valid_status_codes or []):
+            results.append((value, state._(
+                u'The web server responded with a bad status code: {0:d} {1}').format(code, reason)))
+        else:
+            results.append((value, None))
+    return results
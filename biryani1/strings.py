@@ -27,8 +27,15 @@
 
 import unicodedata
 
+try:
+    from hmac import compare_digest
+except ImportError:
+    # Python < 2.7.7
+    compare_digest = None
+
 
 __all__ = [
+    'constant_time_compare',
     'deep_decode',
     'deep_encode',
     'lower',
@@ -108,6 +115,27 @@ ASCII_TRANSLATIONS = {
     }
 
 
+def constant_time_compare(a, b):
+    """Return whether two bytes strings (digests, signatures...) are equal, in a time that doesn't depend on their
+    content, but only on their length.
+
+    >>> constant_time_compare('\\x01\\x02\\x03', '\\x01\\x02\\x03')
+    True
+    >>> constant_time_compare('\\x01\\x02\\x03', '\\x01\\x02\\x04')
+    False
+    >>> constant_time_compare('\\x01\\x02\\x03', '\\x01\\x02')
+    False
+    """
+    if compare_digest is not None:
+        return compare_digest(a, b)
+    if len(a) != len(b):
+        return False
+    difference = 0
+    for a_byte, b_byte in zip(bytearray(a), bytearray(b)):
+        difference |= a_byte ^ b_byte
+    return difference == 0
+
+
 def deep_decode(value, encoding = 'utf-8'):
     """Convert recursively bytes strings embedded in Python data to unicode strings.
 
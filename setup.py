@@ -63,6 +63,11 @@ setup(
     data_files = [
         ('share/locale/fr/LC_MESSAGES', ['biryani1/i18n/fr/LC_MESSAGES/biryani1.mo']),
         ],
+    extras_require = {
+        'async': [
+            "futures >= 2.1",
+            ],
+        },
     install_requires = [
         "Babel >= 0.9.4",
         ],